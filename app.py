@@ -1,17 +1,23 @@
 import streamlit as st
 import time
 import json
-import zipfile
-import io
-import concurrent.futures
-from openai import OpenAI
+import uuid
+import jobs
+import llm
+import metrics
+from cache import result_cache
+from store import session_store
+from catalog import BUSINESS_TYPES, INDUSTRY_OPTIONS, STRUCTURE_OPTIONS, SEGMENT_OPTIONS, catalog, default_attributes
+from artifacts import build_artifacts, read_artifact
+from bundle import minify_css
+from generation import fill_placeholders, plan_sections, stale_sections, split_sections
+from templates import render_page
 
 # --- Configuration ---
 st.set_page_config(page_title="BizOnboard Builder", page_icon="🚀", layout="wide")
 
 # --- Custom CSS (Fixed for Overlapping & JSON) ---
-st.markdown("""
-<style>
+APP_CSS = """
     /* Main App Background */
     .stApp { background-color: #0e1117; color: #f0f2f6; }
     
@@ -49,8 +55,14 @@ st.markdown("""
     .stTabs [aria-selected="true"] { background-color: #00C853; }
 
     .element-container { margin-bottom: 1.5rem; }
-</style>
-""", unsafe_allow_html=True)
+"""
+
+@st.cache_resource(show_spinner=False)
+def app_style():
+    # Minified once per process; Streamlit still needs it sent on every run
+    return f"<style>{minify_css(APP_CSS)}</style>"
+
+st.markdown(app_style(), unsafe_allow_html=True)
 
 # --- SECRETS MANAGEMENT ---
 try:
@@ -62,7 +74,28 @@ except KeyError:
     st.error("⚠️ `OPENAI_API_KEY` not found in secrets. Please configure it in your Streamlit dashboard.")
     st.stop()
 
+# --- METRICS ENDPOINT (once per process) ---
+metrics.serve()
+
+# --- WARM-UP (once per process) ---
+@st.cache_resource(show_spinner=False)
+def warm_up(api_key, model_name):
+    # Opens the OpenAI connection in the background, so the first generation on a fresh replica does not pay for it
+    return llm.warm_up(api_key, model_name)
+
 # --- STATE MANAGEMENT ---
+PERSISTED_KEYS = ("step", "data", "messages", "generation_complete", "artifacts_key", "missing_sections", "last_trace")
+
+if "session_id" not in st.session_state:
+    # The id rides in the URL, so a refresh, a server restart or another worker picks the onboarding back up
+    st.session_state.session_id = st.query_params.get("session") or uuid.uuid4().hex
+    st.query_params["session"] = st.session_state.session_id
+    for key, value in (session_store.load_state(st.session_state.session_id) or {}).items():
+        st.session_state[key] = value
+    if st.session_state.get("generation_complete"):
+        st.session_state.result = session_store.load_result(st.session_state.session_id)
+        # An evicted result is generated again, mostly from the section cache
+        if st.session_state.result is None: st.session_state.generation_complete = False
 if "step" not in st.session_state: st.session_state.step = 0
 if "data" not in st.session_state: st.session_state.data = {}
 if "generation_complete" not in st.session_state: st.session_state.generation_complete = False
@@ -70,144 +103,152 @@ if "show_success" not in st.session_state: st.session_state.show_success = False
 if "messages" not in st.session_state:
     st.session_state.messages = [{"role": "assistant", "content": "Hello! I am your BizOnboard Builder.\n\nLet's build a complete **Data-Driven Digital Presence**. First, what is your **Business Name**?"}]
 
-# --- CONSTANTS ---
-BUSINESS_TYPES = [
-    "Service-Based Business", "Professional Service Business", "E-commerce Store",
-    "Product-Based Business", "Asset / Transaction-Based Business", "Digital Product / Service Business"
-]
-
-INDUSTRY_OPTIONS = [
-    "Architecture & Design", "Hospitality & Tourism", "Real Estate & Property Development",
-    "Healthcare & Medical Services", "Retail & Consumer Goods"
-]
-
-STRUCTURE_OPTIONS = ["Single Page", "Multi Page", "Landing Page"]
-
-SEGMENT_OPTIONS = [
-    "B2C (Individual Consumers)", "B2B (Businesses / Companies)",
-    "B2B2C (Businesses serving end customers)", "D2C (Direct to Consumer)", "Niche / Enthusiast Audience"
-]
-
-INDUSTRY_TO_MODELS = {
-    "Architecture & Design": ["Architectural Service", "Interior Design", "Landscape Design", "Consultation Service"],
-    "Hospitality & Tourism": ["Hotel / Accommodation", "Travel Package", "Restaurant / Cafe", "Event / Venue"],
-    "Real Estate & Property Development": ["Property Sales", "Rental Property", "Property Management", "Development Project"],
-    "Healthcare & Medical Services": ["Medical Service", "Clinic / Hospital", "Telehealth", "Wellness / Therapy"],
-    "Retail & Consumer Goods": ["E-commerce Product", "Retail Store", "Wholesale / B2B", "Subscription Box"]
-}
-
-ATTRIBUTE_DEFAULTS = {
-    "E-commerce Product": { "Fashion/Apparel": ["Size", "Color", "Material", "Fit"], "Electronics": ["Brand", "Model", "Specs"], "General": ["Weight", "Dimensions"] },
-    "Retail Store": ["Category", "Availability", "Location", "Price"],
-    "Hotel / Accommodation": ["Room Type", "Bed Config", "View", "Amenities", "Meal Plan"],
-    "Travel Package": ["Duration", "Destination", "Inclusions", "Hotel Category"],
-    "Restaurant / Cafe": ["Cuisine", "Dietary Info", "Spiciness", "Portion"],
-    "Medical Service": ["Service Type", "Doctor", "Fee", "Duration"],
-    "Telehealth": ["Platform", "Duration", "Specialist"],
-    "Property Sales": ["Type", "Area", "Bedrooms", "Price", "Location"],
-    "Rental Property": ["Type", "Rent", "Deposit", "Available From"],
-    "Architectural Service": ["Project Type", "Style", "Sq Ft", "Timeline"],
-    "Interior Design": ["Room Type", "Style", "Budget", "Materials"],
-    "General Service": ["Duration", "Level", "Provider", "Location"]
-}
-
-CUSTOM_ATTR_POOLS = {
-    "Hotel / Accommodation": ["Pet Friendly", "Parking", "Pool Access", "Smoking Policy", "Floor Level", "Accessibility", "Cancellation Policy"],
-    "Travel Package": ["Group Size", "Guide Language", "Visa Requirements", "Start City", "End City", "Age Limit"],
-    "Restaurant / Cafe": ["Allergens", "Calorie Count", "Chef Special", "Serving Temp", "Pairing"],
-    "Property Sales": ["Parking Spaces", "Year Built", "Facing Direction", "Floor Number", "Gated Community"],
-    "Rental Property": ["Lease Term", "Security Deposit", "Maintenance Fee", "Furnishing Details", "Pet Policy"],
-    "Medical Service": ["Insurance Accepted", "Languages Spoken", "Experience", "Gender of Doctor", "Wheelchair Access"],
-    "Telehealth": ["Platform Used", "Recording Available", "Prescription Digital"],
-    "E-commerce Product": ["Weight", "Warranty Period", "Return Policy", "Country of Origin", "Fragile", "Eco-friendly", "Expiry Date"],
-    "Retail Store": ["Store Hours", "Parking", "Fitting Rooms", "Payment Methods"],
-    "Architectural Service": ["Green Certification", "3D Rendering", "Permit Handling", "Revisions Included"],
-    "Interior Design": ["Color Palette", "Furniture Sourcing", "Lighting Plan", "Vastu/Feng Shui"],
-    "General Service": ["Urgency Fee", "Revisions", "Source Files", "Support Period"]
-}
-
-# --- HELPER FUNCTIONS ---
-def get_suggestion_pool(model_key, industry):
-    if model_key in CUSTOM_ATTR_POOLS: return CUSTOM_ATTR_POOLS[model_key]
-    if industry == "Hospitality & Tourism": return CUSTOM_ATTR_POOLS["Hotel / Accommodation"]
-    elif industry == "Real Estate & Property Development": return CUSTOM_ATTR_POOLS["Property Sales"]
-    elif industry == "Healthcare & Medical Services": return CUSTOM_ATTR_POOLS["Medical Service"]
-    elif industry == "Retail & Consumer Goods": return CUSTOM_ATTR_POOLS["E-commerce Product"]
-    return CUSTOM_ATTR_POOLS["General Service"]
-
-def create_zip(pages_dict):
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
-        for page_title, html_content in pages_dict.items():
-            filename = "index.html" if page_title.lower() == "home" else f"{page_title.lower().replace(' ', '_')}.html"
-            zip_file.writestr(filename, html_content)
-    return zip_buffer.getvalue()
-
-def generate_dalle_image(api_key, image_prompt):
-    client = OpenAI(api_key=api_key)
-    try:
-        response = client.images.generate(model="dall-e-3", prompt=image_prompt, size="1024x1024", quality="standard", n=1)
-        return response.data[0].url
-    except Exception:
-        return "https://placehold.co/1024x1024/222/FFF?text=Image+Generation+Error"
-
-def generate_business_package(api_key, model_name, data):
-    client = OpenAI(api_key=api_key)
-    model_type = data.get('business_model', 'General')
-    structure = data.get('structure', 'Single Page')
-    attributes_final = ", ".join(data.get('final_attributes', []))
-    
-    if structure == "Single Page":
-        structure_rules = "Generate a Single-Page website. All content vertically stacked on index.html with anchor links. Sticky Header."
-        json_hint = '"ui_pages": { "Home": "Full HTML5 string..." }'
-    elif structure == "Multi Page":
-        structure_rules = "Generate a Multi-Page website. Separate HTML strings for Home, About, Services, Contact. Navbar links to files."
-        json_hint = '"ui_pages": { "Home": "<html>...", "About": "<html>...", "Services": "<html>...", "Contact": "<html>..." }'
-    else: 
-        structure_rules = "Generate a Landing Page. Focus on conversion, Hero, Benefits, CTA. Single file."
-        json_hint = '"ui_pages": { "Home": "Full HTML5 string..." }'
-
-    prompt = f"""
-    You are a Lead UI/UX Architect.
-    Client: {data.get('name')} | Industry: {data.get('industry')} | Model: {model_type}
-    Structure: {structure} | Product: {data.get('prod_name')} | Attributes: {attributes_final}
-    
-    **DESIGN MANDATE:**
-    1. **COLOR PALETTE:** Auto-generate a premium palette based on '{data.get('industry')}'. Use CSS :root variables.
-    2. **LOGO:** CSS-styled Logo Brand Mark in Navbar (FontAwesome Icon + Google Font).
-    3. **UI:** Modern CSS (Flexbox, Grid, Shadows, Hover Effects).
-    
-    TASK 1: Generate Data (JSON). Auto-generate suitable Product Descriptions.
-    TASK 2: Generate Website Structure.
-    *** STRICT RULES FOR '{structure}' ***
-    {structure_rules}
-    
-    OUTPUT JSON (Strict):
-    {{
-        "business_details": {{ "name": "String", "model": "{model_type}", "structure": "{structure}" }},
-        "categories_tree": [ {{ "id": 1, "name": "Auto-Main", "children": [ {{ "id": 2, "name": "Auto-Sub" }} ] }} ],
-        "attribute_sets": [ {{ "name": "Custom Set", "attributes": {json.dumps(data.get('final_attributes', []))} }} ],
-        "sample_products": [
-            {{
-                "id": "P001", "name": "{data.get('prod_name')}", "description": "Auto-generated...", "price": 100,
-                "attributes": {{ "Attr": "Val" }}, "variants": [ {{ "sku": "V1", "spec": "Var1", "stock": 10 }} ],
-                "pricing_rules": [ {{ "name": "Rule", "rule": "Desc" }} ]
-            }}
-        ],
-        "marketing_banner_html": "<div style='padding: 15px; text-align: center; background: linear-gradient(90deg, #667eea 0%, #764ba2 100%); color: white; font-weight: bold;'>🚀 Launch Offer!</div>",
-        {json_hint}
-    }}
-    Constraints: Return ONLY raw JSON. No markdown.
-    """
-    try:
-        response = client.chat.completions.create(
-            model=model_name,
-            messages=[{"role": "system", "content": "You are a JSON factory."}, {"role": "user", "content": prompt}]
-        )
-        content = response.choices[0].message.content.strip().replace("```json", "").replace("```", "")
-        return json.loads(content), prompt
-    except Exception as e:
-        return {"error": str(e)}, prompt
+# Every change ends in st.rerun(), so saving at the top of the next run catches all of them; unchanged state is not rewritten
+persisted = {key: st.session_state[key] for key in PERSISTED_KEYS if key in st.session_state}
+if (snapshot := json.dumps(persisted, sort_keys=True, default=str)) != st.session_state.get("saved_state"):
+    session_store.save_state(st.session_state.session_id, persisted)
+    st.session_state.saved_state = snapshot
+
+# --- RESULT RENDERING ---
+TAB_NAMES = ["🖥️ Live Pages", "📦 Product Sets", "🔧 Attribute Sets", "📂 Categories", "📢 Banner", "💾 JSON Data", "📥 Download"]
+HERO_PREVIEW_URL = "https://placehold.co/1024x1024/222/FFF?text=Generating+Image..."
+JOB_POLL_S = 1.0
+
+def render_products(products):
+    st.subheader("Generated Inventory Strategy")
+    if products:
+        for p in products:
+            with st.expander(f"📦 {p.get('name')} ({p.get('price')})"):
+                c1, c2 = st.columns(2)
+                with c1:
+                    st.markdown("#### Core Attributes")
+                    st.json(p.get("attributes"))
+                with c2:
+                    st.markdown("#### Pricing Rules")
+                    st.dataframe(p.get("pricing_rules"))
+                st.markdown("#### Variants")
+                st.dataframe(p.get("variants"))
+    else:
+        st.warning("No products generated.")
+
+def render_attribute_sets(attr_sets):
+    st.subheader("Attribute Definitions")
+    for aset in attr_sets:
+        st.write(f"**Set Name:** {aset.get('name')}")
+        st.table(aset.get("attributes"))
+
+def render_categories(categories_tree):
+    st.subheader("Category Taxonomy")
+    st.json(categories_tree)
+
+def render_banner(banner_html):
+    st.write("### Marketing Banner")
+    st.components.v1.html(banner_html or "<div>Banner Error</div>", height=400, scrolling=False)
+
+def stream_view(job):
+    # Live preview: each section the background job has parsed so far is drawn into its tab
+    sections = job.snapshot()
+    if details := sections.get("business_details"):
+        st.markdown(f"**{details.get('name')}** · {details.get('model')} · {details.get('structure')}")
+    tabs = st.tabs(TAB_NAMES[:5])
+    hero, data = job.hero_url or HERO_PREVIEW_URL, st.session_state.data
+    for page_name, content in sections.get("page_content", {}).items():
+        page_html = render_page(data, page_name, content, sections.get("sample_products"))
+        with tabs[0].expander(f"🖥️ {page_name}", expanded=True):
+            st.components.v1.html(fill_placeholders(page_html, hero, data.get("prod_name")), height=800, scrolling=True)
+    for tab, key, render in ((tabs[1], "sample_products", render_products), (tabs[2], "attribute_sets", render_attribute_sets),
+                             (tabs[3], "categories_tree", render_categories), (tabs[4], "marketing_banner_html", render_banner)):
+        if key in sections:
+            with tab:
+                render(sections[key])
+
+@st.fragment(run_every=JOB_POLL_S)
+def job_progress(job, stream):
+    # Polls the background job; only this fragment reruns until the job settles
+    if job.done(): st.rerun()
+    if position := job.position():
+        st.warning(f"⏳ High demand right now. You are **#{position}** in the generation queue...")
+    st.progress(job.progress(), text=f"{len(job.completed)}/{len(job.sections)} sections ready · "
+                                     f"{max(0, job.deadline - time.time()):.0f}s until the deadline")
+    if stream: stream_view(job)
+
+@st.fragment
+def render_result(res, data, artifacts_key):
+    # Only the selected view is built, and switching views or pages reruns just this fragment
+    render_started = time.perf_counter()
+    pages = res.get("ui_pages", {})
+    view = st.segmented_control("View", TAB_NAMES, default=TAB_NAMES[0], key="result_view", label_visibility="collapsed") or TAB_NAMES[0]
+
+    if view == TAB_NAMES[0]:
+        st.write("### Website Preview")
+        if len(pages) > 1:
+            page_selection = st.radio("Navigate Pages:", list(pages.keys()), horizontal=True, key="page_nav")
+            html_content = pages.get(page_selection, "<div>No content</div>")
+        else:
+            html_content = list(pages.values())[0] if pages else "<div>No content</div>"
+        st.components.v1.html(html_content, height=800, scrolling=True)
+    elif view == TAB_NAMES[1]:
+        render_products(res.get("sample_products", []))
+    elif view == TAB_NAMES[2]:
+        render_attribute_sets(res.get("attribute_sets", []))
+    elif view == TAB_NAMES[3]:
+        render_categories(res.get("categories_tree"))
+    elif view == TAB_NAMES[4]:
+        render_banner(res.get("marketing_banner_html", "<div>Banner Error</div>"))
+    elif view == TAB_NAMES[5]:
+        st.subheader("Complete JSON Response")
+        st.json({**res, "ui_pages": dict(pages)})
+    else:
+        st.subheader("📦 Download Complete Package")
+        c1, c2 = st.columns(2)
+        # Deferred downloads: the prebuilt files are only read when a button is clicked
+        with c1:
+            st.download_button("Download Site (.zip)", lambda: read_artifact(artifacts_key, "zip", res),
+                               f"{data['name']}_site.zip", "application/zip", on_click="ignore")
+        with c2:
+            st.download_button("Download Data (.json)", lambda: read_artifact(artifacts_key, "json", res),
+                               f"{data['name']}_data.json", "application/json", on_click="ignore")
+
+    st.session_state.render_s = time.perf_counter() - render_started
+    metrics.observe("bizonboard_stage_seconds", st.session_state.render_s, stage="render")
+
+EDIT_KEYS = ("edit_industry", "edit_model", "edit_structure", "edit_segment", "edit_prod_name", "edit_attrs")
+
+def section_label(section):
+    return f"{section.split(':', 1)[1]} page" if section.startswith("page:") else section
+
+def _index(options, value):
+    return options.index(value) if value in options else 0
+
+@st.fragment
+def edit_panel(res, data):
+    # Changing a field reruns only this panel; applying reruns the app, which regenerates just the stale sections
+    c1, c2 = st.columns(2)
+    industry = c1.selectbox("Industry", INDUSTRY_OPTIONS, index=_index(INDUSTRY_OPTIONS, data.get("industry")), key="edit_industry")
+    models = catalog.models_for(industry)
+    model_key = c2.selectbox("Business Model", models, index=_index(models, data.get("business_model")), key="edit_model")
+    structure = c1.selectbox("Website Structure", STRUCTURE_OPTIONS, index=_index(STRUCTURE_OPTIONS, data.get("structure")), key="edit_structure")
+    segment = c2.selectbox("Target Segment", SEGMENT_OPTIONS, index=_index(SEGMENT_OPTIONS, data.get("segment")), key="edit_segment")
+    prod_name = st.text_input("Product Name", data.get("prod_name", ""), key="edit_prod_name")
+    current = data.get("final_attributes") or []
+    options = list(dict.fromkeys(current + catalog.suggestions(model_key, industry, default_attributes(model_key))))
+    final_attrs = st.multiselect("Attributes", options, default=current, key="edit_attrs")
+
+    edited = {**data, "industry": industry, "business_model": model_key, "structure": structure, "segment": segment,
+              "prod_name": prod_name.strip(), "final_attributes": final_attrs}
+    if edited == data:
+        st.caption("Change any answer to see what would be regenerated.")
+        return
+    stale = stale_sections(data, edited)
+    reused = [section for section in plan_sections(edited) if section not in stale]
+    st.caption(f"Regenerates: **{', '.join(map(section_label, stale)) or 'nothing'}** · reuses {len(reused)} of {len(plan_sections(edited))} sections")
+    if st.button("Apply changes", type="primary", disabled=not final_attrs or not edited["prod_name"]):
+        for key in EDIT_KEYS: st.session_state.pop(key, None)  # the widgets start from the new answers next time
+        st.session_state.data = edited
+        if stale:
+            st.session_state.edit_reuse = split_sections(res, reused + ([] if "hero image" in stale else ["hero image"]))
+            st.session_state.generation_complete = False
+        st.rerun()
 
 # --- CHAT LOGIC ---
 def add_msg(role, content):
@@ -234,10 +275,45 @@ def process_input(text):
 with st.sidebar:
     st.title("💎 Design Config")
     if st.button("Restart", type="primary"):
+        jobs.cancel(st.session_state.get("session_id"))
+        if "session_id" in st.session_state: session_store.delete(st.session_state.session_id)
         st.session_state.clear()
+        st.query_params.clear()
         st.rerun()
     # Model Selection (Hidden, hardcoded to gpt-5)
     selected_model = "gpt-5"
+    warm_up(api_key, selected_model)
+    stream_results = st.toggle("Stream results", value=True, help="Show each section as soon as the model writes it.")
+    use_cache = st.toggle("Reuse cached results", value=result_cache.enabled, disabled=not result_cache.enabled,
+                          help="Return identical configurations from the local cache instead of calling OpenAI again.")
+    cache_stats = result_cache.stats() if result_cache.enabled else None
+    if cache_stats:
+        st.caption(f"Cache: {cache_stats['hits']} hits · {cache_stats['misses']} misses · {cache_stats['entries']} entries")
+
+    with st.expander("📈 Performance & Cost"):
+        last_trace = st.session_state.get("last_trace")
+        if last_trace:
+            st.caption(f"Last generation: {last_trace['wall_s']:.1f}s · ≈ ${last_trace['cost_usd']:.4f}")
+            st.dataframe([
+                {"Stage": stage, "Calls": s["count"], "Max (ms)": round(s["max_s"] * 1000), "Total (ms)": round(s["total_s"] * 1000)}
+                for stage, s in last_trace["stages"].items()
+            ], hide_index=True)
+            for model, t in last_trace["tokens"].items():
+                share = t["cached"] / t["prompt"] if t["prompt"] else 0.0
+                st.caption(f"{model}: {t['prompt']:,} prompt ({t['cached']:,} cached, {share:.0%}) · {t['completion']:,} completion tokens")
+        else:
+            st.caption("Timings and token usage appear after the first generation.")
+        if st.session_state.get("render_s") is not None:
+            st.caption(f"Last page render: {st.session_state.render_s * 1000:.0f} ms")
+        if metrics.METRICS_PORT:
+            st.caption(f"Prometheus metrics: `{metrics.METRICS_HOST}:{metrics.METRICS_PORT}/metrics`")
+
+# --- SPECULATIVE GENERATION ---
+# Sections start as soon as the answers they depend on are in; step 20 then mostly finds them ready
+if st.session_state.step < 20 and use_cache:
+    jobs.speculate(st.session_state.session_id, api_key, selected_model, st.session_state.data)
+elif not use_cache:
+    jobs.cancel_speculation(st.session_state.session_id)  # their results would only land in the cache
 
 # --- UI: CHAT ---
 if st.session_state.step <= 15:
@@ -270,7 +346,9 @@ if st.session_state.step <= 15:
     elif st.session_state.step == 2:
         with st.chat_message("assistant"):
             st.write("**Select Industry:**")
-            industry = st.radio("Choose One:", INDUSTRY_OPTIONS, index=None, key="industry_radio")
+            # A full taxonomy is too long for radio buttons; the selectbox filters as you type
+            if len(INDUSTRY_OPTIONS) <= 8: industry = st.radio("Choose One:", INDUSTRY_OPTIONS, index=None, key="industry_radio")
+            else: industry = st.selectbox("Choose One:", INDUSTRY_OPTIONS, index=None, placeholder="Search industries...", key="industry_radio")
             if industry:
                 if st.button("Confirm Industry"):
                     st.session_state.data["industry"] = industry
@@ -341,7 +419,7 @@ if st.session_state.step <= 15:
     # --- STEP 9: BUSINESS MODEL ---
     elif st.session_state.step == 9:
         industry = st.session_state.data.get("industry", "Retail & Consumer Goods")
-        relevant_models = INDUSTRY_TO_MODELS.get(industry, ["General Service", "General Product"])
+        relevant_models = catalog.models_for(industry)
         
         with st.chat_message("assistant"):
             st.write(f"**Select Specific Business Model for {industry}:**")
@@ -359,16 +437,11 @@ if st.session_state.step <= 15:
         model_key = st.session_state.data.get("business_model", "")
         industry = st.session_state.data.get("industry", "")
         
-        # 1. Defaults
-        if model_key in ATTRIBUTE_DEFAULTS:
-            attr_options = ATTRIBUTE_DEFAULTS[model_key]
-        else:
-            attr_options = ATTRIBUTE_DEFAULTS["General Service"]
-
-        # 2. Suggestion Pool
-        suggestion_pool = get_suggestion_pool(model_key, industry)
+        # Defaults (falls back to the catalog's general set)
+        attr_options = catalog.attribute_options(model_key)
 
         with st.chat_message("assistant"):
+            sub_type = None
             if isinstance(attr_options, dict):
                 st.write(f"**What type of {model_key}?**")
                 sub_type = st.selectbox("Select Category:", list(attr_options.keys()))
@@ -388,11 +461,15 @@ if st.session_state.step <= 15:
                 st.session_state.step = 13
                 st.rerun()
             elif choice == "Customize":
-                # Combine defaults with specific pool ONLY.
-                combined_options = list(set(defaults + suggestion_pool)) 
-                
+                # Ranked suggestions plus whatever the search finds; picks already made always stay listed
+                suggestions = catalog.suggestions(model_key, industry, defaults)
+                query = st.text_input("Search all attributes:", placeholder="e.g. warranty, parking, size...", key="attr_search")
+                hits = catalog.search(query, limit=20, boost=suggestions) if query else []
+                select_key = f"attr_select:{sub_type}"  # a new category starts again from its own defaults
+                combined_options = list(dict.fromkeys(st.session_state.get(select_key, []) + suggestions + hits))
+
                 st.write("**Add/Remove Attributes:**")
-                final_attrs = st.multiselect("Select Attributes:", options=combined_options, default=defaults)
+                final_attrs = st.multiselect("Select Attributes:", options=combined_options, default=defaults, key=select_key)
                 if st.button("Confirm Custom Attributes"):
                     st.session_state.data["final_attributes"] = final_attrs
                     add_msg("assistant", "Attributes saved. What is the **Product Name**?")
@@ -413,40 +490,40 @@ if st.session_state.step <= 15:
 elif st.session_state.step == 20:
     data = st.session_state.data
     
-    # 1. GENERATION PHASE (Runs Once)
+    # 1. GENERATION PHASE (background job; reruns only poll it)
     if not st.session_state.generation_complete:
-        st.info(f"⚡ Architecting {data.get('business_model')} Data & {data.get('structure')}...")
-        manual_image_prompt = f"A photorealistic, 4k hero image for a {data.get('business_model')} business named {data['name']}. Context: {data['industry']}."
-        
-        with st.spinner(f"🤖 Coding {data.get('structure')} Website..."):
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                future_gpt = executor.submit(generate_business_package, api_key, selected_model, data)
-                future_dalle = executor.submit(generate_dalle_image, api_key, manual_image_prompt)
-                
-                structure_res, used_prompt = future_gpt.result()
-                dalle_url = future_dalle.result()
-
-            if "error" in structure_res:
-                st.error(f"GPT Error: {structure_res['error']}")
-                with st.expander("Show Prompt"):
-                    st.code(used_prompt)
-                st.stop()
-            
-            # Inject Image
-            final_pages = {}
-            raw_pages = structure_res.get("ui_pages", {})
-            for page_name, page_html in raw_pages.items():
-                final_pages[page_name] = page_html.replace("HERO_IMAGE_PLACEHOLDER", dalle_url)
-            
-            st.session_state.result = {
-                **structure_res,
-                "ui_pages": final_pages,
-                "generated_image_url": dalle_url
-            }
-            # MARK AS COMPLETE & SET SUCCESS FLAG
-            st.session_state.generation_complete = True
-            st.session_state.show_success = True
-            st.rerun() # Strict rerun to clear loading UI
+        session_id = st.session_state.session_id
+        job = jobs.start(session_id, api_key, selected_model, data, use_cache, stream_results, st.session_state.get("edit_reuse"))
+
+        if job.status == "failed":
+            st.error(f"GPT Error: {job.error}")
+            if st.button("🔁 Retry failed sections"):
+                # Sections that did parse are handed to the next job, so a retry only pays for the broken ones
+                st.session_state.edit_reuse = {**(st.session_state.get("edit_reuse") or {}), **job.parts}
+                jobs.cancel(session_id)
+                st.rerun()
+            with st.expander("Show Prompt"):
+                st.code(job.prompt)
+            st.stop()
+
+        if not job.done():
+            st.info(f"⚡ Architecting {data.get('business_model')} Data & {data.get('structure')}...")
+            job_progress(job, stream_results)
+            st.stop()
+
+        # The store keeps the pages; this session only holds the small parts and loads a page when it is shown
+        session_store.save_result(session_id, job.result)
+        st.session_state.result = session_store.load_result(session_id)
+        st.session_state.missing_sections = job.missing
+        # Download files are built once here, not on every rerun
+        st.session_state.artifacts_key = build_artifacts(job.result)
+        st.session_state.last_trace = job.trace
+        jobs.cancel(session_id)  # Finished; the store has the result, so the job's copy can go
+        st.session_state.pop("edit_reuse", None)
+        # MARK AS COMPLETE & SET SUCCESS FLAG
+        st.session_state.generation_complete = True
+        st.session_state.show_success = True
+        st.rerun() # Strict rerun to clear loading UI
 
     # 2. RENDERING PHASE (Stable View)
     if st.session_state.generation_complete:
@@ -454,68 +531,12 @@ elif st.session_state.step == 20:
         if st.session_state.show_success:
             st.balloons()
             st.success("✅ BizOnboard Generation Complete!")
+            if st.session_state.get("missing_sections"):
+                st.warning(f"⏱️ Deadline reached; delivered without: {', '.join(st.session_state.missing_sections)}.")
             st.session_state.show_success = False # Turn off for next render
         
-        res = st.session_state.result
-        pages = res.get("ui_pages", {})
-
         st.title(f"{data['name']} - {data.get('business_model')} Platform")
-
-        tabs = st.tabs(["🖥️ Live Pages", "📦 Product Sets", "🔧 Attribute Sets", "📂 Categories", "📢 Banner", "💾 JSON Data", "📥 Download"])
-
-        with tabs[0]:
-            st.write("### Website Preview")
-            if len(pages) > 1:
-                page_selection = st.radio("Navigate Pages:", list(pages.keys()), horizontal=True)
-                html_content = pages.get(page_selection, "<div>No content</div>")
-            else:
-                html_content = list(pages.values())[0] if pages else "<div>No content</div>"
-            st.components.v1.html(html_content, height=800, scrolling=True)
-
-        with tabs[1]:
-            st.subheader("Generated Inventory Strategy")
-            products = res.get("sample_products", [])
-            if products:
-                for p in products:
-                    with st.expander(f"📦 {p.get('name')} ({p.get('price')})"):
-                        c1, c2 = st.columns(2)
-                        with c1:
-                            st.markdown("#### Core Attributes")
-                            st.json(p.get("attributes"))
-                        with c2:
-                            st.markdown("#### Pricing Rules")
-                            st.dataframe(p.get("pricing_rules"))
-                        st.markdown("#### Variants")
-                        st.dataframe(p.get("variants"))
-            else:
-                st.warning("No products generated.")
-
-        with tabs[2]:
-            st.subheader("Attribute Definitions")
-            attr_sets = res.get("attribute_sets", [])
-            for aset in attr_sets:
-                st.write(f"**Set Name:** {aset.get('name')}")
-                st.table(aset.get("attributes"))
-
-        with tabs[3]:
-            st.subheader("Category Taxonomy")
-            st.json(res.get("categories_tree"))
-
-        with tabs[4]:
-            st.write("### Marketing Banner")
-            banner_html = res.get("marketing_banner_html", "<div>Banner Error</div>")
-            st.components.v1.html(banner_html, height=400, scrolling=False)
-
-        with tabs[5]:
-            st.subheader("Complete JSON Response")
-            st.json(res)
-
-        with tabs[6]:
-            st.subheader("📦 Download Complete Package")
-            c1, c2 = st.columns(2)
-            with c1:
-                zip_data = create_zip(pages)
-                st.download_button("Download Site (.zip)", zip_data, f"{data['name']}_site.zip", "application/zip")
-            with c2:
-                json_str = json.dumps(res, indent=2)
-                st.download_button("Download Data (.json)", json_str, f"{data['name']}_data.json", "application/json")
+        with st.expander("✏️ Edit answers"):
+            edit_panel(st.session_state.result, data)
+        artifacts_key = st.session_state.get("artifacts_key") or build_artifacts(st.session_state.result)
+        render_result(st.session_state.result, data, artifacts_key)
@@ -0,0 +1,67 @@
+import collections
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+import metrics
+from bundle import optimize_site
+from generation import create_zip
+
+# --- Configuration ---
+SPOOL_MAX_BYTES = int(os.environ.get("BIZONBOARD_SPOOL_MAX_BYTES", str(1024 * 1024)))  # larger artifacts roll over to disk
+MAX_ARTIFACTS = int(os.environ.get("BIZONBOARD_MAX_ARTIFACTS", "64"))
+
+_lock = threading.Lock()
+_store = collections.OrderedDict()  # content hash -> {"zip": file, "json": file}; LRU order
+
+
+def content_hash(result):
+    return hashlib.sha256(json.dumps(result, sort_keys=True).encode("utf-8")).hexdigest()
+
+def _spool(payload):
+    spooled = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    spooled.write(payload)
+    return spooled
+
+def build_artifacts(result, digest=None):
+    # Builds the download files once per distinct result; identical results from
+    # different sessions (cache hits) share one copy. Returns the content hash.
+    result = {**result, "ui_pages": dict(result.get("ui_pages", {}))}  # pages may be loaded lazily from the store
+    digest = digest or content_hash(result)
+    with _lock:
+        if digest in _store:
+            _store.move_to_end(digest)
+            return digest
+    with metrics.span("artifacts"):
+        pages, assets = optimize_site(result.get("ui_pages", {}), result.get("generated_image_url"))
+        files = {
+            "zip": _spool(create_zip(pages, assets)),
+            "json": _spool(json.dumps(result, indent=2).encode("utf-8")),
+        }
+    with _lock:
+        if digest in _store:  # Another session built the same result meanwhile
+            for spooled in files.values():
+                spooled.close()
+            return digest
+        _store[digest] = files
+        while len(_store) > max(1, MAX_ARTIFACTS):
+            for spooled in _store.popitem(last=False)[1].values():
+                spooled.close()
+    return digest
+
+def _read(digest, kind):
+    with _lock:
+        files = _store.get(digest)
+        if not files: return None
+        files[kind].seek(0)
+        return files[kind].read()
+
+def read_artifact(digest, kind, result):
+    # Called lazily when the user clicks a download button; rebuilds if the entry was evicted
+    payload = _read(digest, kind)
+    if payload is None:
+        build_artifacts(result, digest)
+        payload = _read(digest, kind)
+    return payload
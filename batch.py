@@ -0,0 +1,182 @@
+import argparse
+import asyncio
+import json
+import os
+import re
+import statistics
+import sys
+import time
+
+import llm
+from bulk import BULK_MAX_PRODUCTS, CATALOG_FORMATS, agenerate_catalog
+from bundle import optimize_site
+from catalog import validate_record
+from generation import agenerate_business_package, agenerate_dalle_image, create_zip, finalize_package, image_prompt
+
+# Headless onboarding: one JSONL record per business, using the same keys the wizard
+# stores in st.session_state.data (plus an optional "id").
+#
+#   python batch.py answers.jsonl --out batch_out --concurrency 8
+#
+# Every finished record is written to <out>/<id>_<name>_site.zip and _data.json and logged
+# to <out>/manifest.jsonl. Re-running the same command skips records already in the manifest.
+# With --products N (or a record's "catalog_size") a bulk catalog of N products is exported to
+# <out>/<id>_<name>_catalog/ and added to the zip under catalog/.
+
+DEFAULT_MODEL = "gpt-5"
+MANIFEST = "manifest.jsonl"
+
+
+def load_api_key():
+    if os.environ.get("OPENAI_API_KEY"): return os.environ["OPENAI_API_KEY"]
+    secrets_path = os.path.join(".streamlit", "secrets.toml")
+    if os.path.exists(secrets_path):
+        import tomllib
+        with open(secrets_path, "rb") as f:
+            return tomllib.load(f).get("OPENAI_API_KEY")
+    return None
+
+def read_records(path):
+    seen = set()
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip(): continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield str(line_no), None, [f"invalid JSON: {e}"]
+                continue
+            record_id = str(record.pop("id", None) or line_no)
+            data, errors = validate_record(record)
+            if record_id in seen: errors.append(f"duplicate id '{record_id}'")
+            size = data.get("catalog_size")
+            if size is not None and (not isinstance(size, int) or isinstance(size, bool) or not 0 <= size <= BULK_MAX_PRODUCTS):
+                errors.append(f"'catalog_size' must be a whole number from 0 to {BULK_MAX_PRODUCTS}")
+            seen.add(record_id)
+            yield record_id, data, errors
+
+def load_finished(out_dir):
+    # Records that succeeded; failed ones are retried on resume and invalid ones validated again, since the
+    # operator may have fixed them in the input file
+    finished = set()
+    path = os.path.join(out_dir, MANIFEST)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # Torn last line after a crash
+                if entry.get("status") == "ok": finished.add(entry["id"])
+    return finished
+
+def output_base(out_dir, record_id, name):
+    return os.path.join(out_dir, re.sub(r"[^A-Za-z0-9._-]+", "_", f"{record_id}_{name}").strip("_")[:120])
+
+def write_atomic(path, payload):
+    with open(path + ".tmp", "wb") as f:
+        f.write(payload)
+    os.replace(path + ".tmp", path)
+
+def write_zip(path, pages, files):
+    with open(path + ".tmp", "wb") as f:
+        create_zip(pages, files, f)
+    os.replace(path + ".tmp", path)
+
+
+async def process_record(record_id, data, args, api_key):
+    started = time.monotonic()
+    session = f"batch:{record_id}"
+    base = output_base(args.out, record_id, data["name"])
+    size = data.get("catalog_size", args.products)
+    bulk = agenerate_catalog(api_key, args.model, data, size, base + "_catalog", args.catalog_format, not args.no_cache, session) if size else asyncio.sleep(0)
+    (structure_res, _), dalle_url, catalog = await asyncio.gather(
+        agenerate_business_package(api_key, args.model, data, not args.no_cache, session),
+        agenerate_dalle_image(api_key, image_prompt(data), not args.no_cache, session),
+        bulk,
+    )
+    if "error" in structure_res: raise RuntimeError(structure_res["error"])
+    result = finalize_package(structure_res, dalle_url, data)
+    if catalog: result["bulk_catalog"] = {"products": catalog["products"], "variants": catalog["variants"]}
+
+    # The catalog files are copied into the archive from disk, straight into the output file
+    pages, assets = await asyncio.to_thread(optimize_site, result["ui_pages"], dalle_url)
+    files = assets + [(f"catalog/{os.path.basename(path)}", path) for path in (catalog or {"files": {}})["files"].values()]
+    await asyncio.to_thread(write_zip, base + "_site.zip", pages, files)
+    await asyncio.to_thread(write_atomic, base + "_data.json", json.dumps(result, indent=2).encode("utf-8"))
+    return time.monotonic() - started
+
+async def run_batch(args, api_key):
+    os.makedirs(args.out, exist_ok=True)
+    finished = load_finished(args.out)
+    counts = {"ok": 0, "failed": 0, "invalid": 0, "skipped": 0}
+    latencies = []
+    started = time.monotonic()
+
+    with open(os.path.join(args.out, MANIFEST), "a", encoding="utf-8") as manifest:
+        def log(entry):
+            manifest.write(json.dumps(entry) + "\n")
+            manifest.flush()
+
+        async def worker(record_id, data):
+            try:
+                elapsed = await process_record(record_id, data, args, api_key)
+            except Exception as e:
+                counts["failed"] += 1
+                log({"id": record_id, "status": "error", "error": str(e)})
+                print(f"✗ {record_id}: {e}", file=sys.stderr)
+            else:
+                counts["ok"] += 1
+                latencies.append(elapsed)
+                log({"id": record_id, "status": "ok", "seconds": round(elapsed, 2)})
+                print(f"✓ {record_id} ({data['name']}) in {elapsed:.1f}s")
+
+        # At most --concurrency records in flight, so memory stays flat for any input size
+        pending = set()
+        for record_id, data, errors in read_records(args.input):
+            if record_id in finished:
+                counts["skipped"] += 1
+                continue
+            if errors:
+                counts["invalid"] += 1
+                log({"id": record_id, "status": "invalid", "errors": errors})
+                print(f"! {record_id}: {'; '.join(errors)}", file=sys.stderr)
+                continue
+            if len(pending) >= args.concurrency:
+                _, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            pending.add(asyncio.create_task(worker(record_id, data)))
+        if pending: await asyncio.wait(pending)
+
+    elapsed = time.monotonic() - started
+    print(f"\nDone in {elapsed:.1f}s: {counts['ok']} ok, {counts['failed']} failed, {counts['invalid']} invalid, {counts['skipped']} skipped (already done)")
+    if latencies:
+        p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else latencies[0]
+        print(f"Throughput: {counts['ok'] / elapsed * 60:.1f} packages/min | latency p50 {statistics.median(latencies):.1f}s, p95 {p95:.1f}s")
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate BizOnboard packages from a JSONL file of onboarding answers.")
+    parser.add_argument("input", help="JSONL file, one onboarding record per line")
+    parser.add_argument("--out", default="batch_out", help="Output directory (also holds the resume manifest)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Records generated at the same time")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--no-cache", action="store_true", help="Always call OpenAI, even for repeated configurations")
+    parser.add_argument("--products", type=int, default=0, help=f"Also export a bulk catalog of this many products (up to {BULK_MAX_PRODUCTS})")
+    parser.add_argument("--catalog-format", default="ndjson,csv", type=lambda v: tuple(f for f in v.split(",") if f),
+                        help=f"Bulk catalog files to write: {', '.join(CATALOG_FORMATS)} (parquet needs pyarrow)")
+    args = parser.parse_args(argv)
+
+    if not 0 <= args.products <= BULK_MAX_PRODUCTS:
+        parser.error(f"--products must be between 0 and {BULK_MAX_PRODUCTS}")
+    if unknown := set(args.catalog_format) - set(CATALOG_FORMATS):
+        parser.error(f"unknown --catalog-format: {', '.join(sorted(unknown))}")
+    api_key = load_api_key()
+    if not api_key:
+        parser.error("OPENAI_API_KEY is not set (environment or .streamlit/secrets.toml)")
+    counts = llm.run(run_batch(args, api_key))
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
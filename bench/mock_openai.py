@@ -0,0 +1,212 @@
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for the two OpenAI endpoints the app uses. Point the SDK at it with
+# OPENAI_BASE_URL=http://127.0.0.1:<port>/v1.
+#
+#   python bench/mock_openai.py --port 8765 --latency lognormal:-1.2,0.5 --tokens-per-sec 800 --error-429 0.05
+
+
+class MockConfig:
+    def __init__(self, latency="lognormal:-1.6,0.4", tokens_per_sec=20000.0, chunk_tokens=8,
+                 error_429=0.0, error_500=0.0, retry_after_ms=50, page_kb=2, products=3, malformed=0.0):
+        self.latency = latency  # time to first token: fixed:S | uniform:A,B | lognormal:MU,SIGMA
+        self.tokens_per_sec = tokens_per_sec
+        self.chunk_tokens = chunk_tokens
+        self.error_429 = error_429
+        self.error_500 = error_500
+        self.retry_after_ms = retry_after_ms
+        self.page_kb = page_kb
+        self.products = products
+        self.malformed = malformed  # share of completions cut short, to exercise partial recovery
+
+    def sample_latency(self):
+        kind, _, params = self.latency.partition(":")
+        args = [float(p) for p in params.split(",") if p]
+        if kind == "fixed": return args[0]
+        if kind == "uniform": return random.uniform(args[0], args[1])
+        if kind == "lognormal": return random.lognormvariate(args[0], args[1])
+        raise ValueError(f"unknown latency distribution '{self.latency}'")
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+class MockStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = {"chat": 0, "images": 0, "429": 0, "500": 0, "malformed": 0, "cached_tokens": 0}
+        self.prefixes = set()
+
+    def bump(self, key, value=1):
+        with self.lock:
+            self.counts[key] += value
+
+    def cached_tokens(self, prompt):
+        # Like the real API: prefixes of 1024+ tokens seen before are cached in 128-token steps (~4 chars per token)
+        boundaries = range(4096, len(prompt) + 1, 512)
+        with self.lock:
+            cached = max((b for b in boundaries if hash(prompt[:b]) in self.prefixes), default=0)
+            self.prefixes.update(hash(prompt[:b]) for b in boundaries)
+        return cached // 4
+
+
+# --- CANNED CONTENT ---
+def page_content(page, kb):
+    section = {"heading": "Section", "body": "Lorem ipsum dolor sit amet. " * 6 + "PRODUCT_NAME_PLACEHOLDER.", "items": ["Fast", "Friendly", "Local"]}
+    count = max(3, int(kb * 1024 / len(json.dumps(section))))
+    return {"headline": f"{page} headline", "subheadline": "Lorem ipsum dolor sit amet.", "cta_label": "Get Started", "sections": [section] * count}
+
+def section_payload(prompt, cfg):
+    # Answer with the fragment the prompt's OUTPUT JSON skeleton asks for
+    if page := re.search(r'"page_content":\s*\{\s*"([^"]+)"', prompt):
+        return {"page_content": {page.group(1): page_content(page.group(1), cfg.page_kb)}}
+    if seeds := re.search(r"Category: (.*) \| Batch: (\d+) \| Count: (\d+)", prompt):
+        category, batch, count = seeds.group(1), int(seeds.group(2)), int(seeds.group(3))
+        attributes = re.search(r"Attributes: ([^|\n]*)", prompt)
+        names = [a.strip() for a in attributes.group(1).split(",") if a.strip()] if attributes else []
+        return {"seeds": [{"name": f"{category} {batch}-{i}", "description": "Mock description. " * 3, "base_price": 50 + i,
+                           "variant_attributes": names[:2]} for i in range(1, count + 1)]}
+    if '"domains": [' in prompt:
+        attributes = re.search(r"Attributes: ([^|\n]*)", prompt)
+        names = [a.strip() for a in attributes.group(1).split(",") if a.strip()] if attributes else []
+        return {"categories": ["Essentials", "Premium", "Accessories"],
+                "domains": [{"name": name, "values": [{"value": f"{name} {v}", "price_delta": v * 5} for v in range(3)]} for name in names[:3]]}
+    if "marketing_banner_html" in prompt:
+        return {"marketing_banner_html": "<div style='padding: 15px; text-align: center;'>🚀 Launch Offer!</div>"}
+    if "sample_products" not in prompt:
+        return {"business_details": {"name": "Mock Business", "model": "Mock Model", "structure": "Single Page"},
+                "categories_tree": [{"id": 1, "name": "Main", "children": [{"id": 2, "name": "Sub"}]}]}
+    products = [{
+        "id": f"P{i:03d}", "name": f"Product {i}", "description": "Mock description. " * 6, "price": 100 + i,
+        "attributes": [{"name": "Size", "value": "M"}, {"name": "Color", "value": "Blue"}],
+        "variants": [{"sku": f"P{i:03d}-V{v}", "spec": f"Var{v}", "stock": 10} for v in range(4)],
+        "pricing_rules": [{"name": "Launch", "rule": "10% off"}]
+    } for i in range(1, cfg.products + 1)]
+    return {
+        "attribute_sets": [{"name": "Custom Set", "attributes": ["Size", "Color"]}],
+        "sample_products": products
+    }
+
+
+# --- SERVER ---
+def make_handler(cfg, stats):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            kind = "images" if self.path.endswith("/images/generations") else "chat"
+            stats.bump(kind)
+            time.sleep(cfg.sample_latency())
+
+            roll = random.random()
+            if roll < cfg.error_429:
+                stats.bump("429")
+                return self._send_json(429, {"error": {"message": "Rate limit reached (mock)", "type": "requests", "code": "rate_limit_exceeded"}},
+                                       {"retry-after-ms": str(cfg.retry_after_ms)})
+            if roll < cfg.error_429 + cfg.error_500:
+                stats.bump("500")
+                return self._send_json(500, {"error": {"message": "The server had an error (mock)", "type": "server_error", "code": None}})
+
+            if kind == "images":
+                return self._send_json(200, {"created": int(time.time()), "data": [{"url": "https://placehold.co/1024x1024/222/FFF?text=Mock+Hero"}]})
+            self._chat(body)
+
+        def _chat(self, body):
+            prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+            content = json.dumps(section_payload(prompt, cfg))
+            if random.random() < cfg.malformed:
+                stats.bump("malformed")
+                content = content[:int(len(content) * random.uniform(0.3, 0.9))]
+            cached = stats.cached_tokens(prompt)
+            stats.bump("cached_tokens", cached)
+            usage = {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4, "total_tokens": (len(prompt) + len(content)) // 4,
+                     "prompt_tokens_details": {"cached_tokens": cached}}
+            base = {"id": "chatcmpl-mock", "created": int(time.time()), "model": body.get("model", "mock")}
+
+            if not body.get("stream"):
+                time.sleep(usage["completion_tokens"] / cfg.tokens_per_sec)
+                return self._send_json(200, {**base, "object": "chat.completion", "usage": usage,
+                                             "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}]})
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            step = cfg.chunk_tokens * 4
+            for i in range(0, len(content), step):
+                time.sleep(cfg.chunk_tokens / cfg.tokens_per_sec)
+                self._sse({**base, "object": "chat.completion.chunk", "choices": [{"index": 0, "delta": {"content": content[i:i + step]}, "finish_reason": None}]})
+            self._sse({**base, "object": "chat.completion.chunk", "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+            if (body.get("stream_options") or {}).get("include_usage"):
+                self._sse({**base, "object": "chat.completion.chunk", "choices": [], "usage": usage})
+            self._chunk(b"data: [DONE]\n\n")
+            self._chunk(b"")
+
+        def _sse(self, payload):
+            self._chunk(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+
+        def _chunk(self, data):
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+        def _send_json(self, status, payload, headers=None):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+    return Handler
+
+def start_server(cfg, port=0):
+    stats = MockStats()
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(cfg, stats))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mock-openai", daemon=True).start()
+    return server, stats
+
+
+def add_config_args(parser):
+    parser.add_argument("--latency", default="lognormal:-1.6,0.4", help="Time to first token: fixed:S | uniform:A,B | lognormal:MU,SIGMA")
+    parser.add_argument("--tokens-per-sec", type=float, default=20000.0)
+    parser.add_argument("--chunk-tokens", type=int, default=8)
+    parser.add_argument("--error-429", type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument("--error-500", type=float, default=0.0, help="Share of requests answered with 500")
+    parser.add_argument("--retry-after-ms", type=int, default=50)
+    parser.add_argument("--page-kb", type=float, default=2, help="Size of each page's copy")
+    parser.add_argument("--products", type=int, default=3)
+    parser.add_argument("--malformed", type=float, default=0.0, help="Share of completions truncated mid-JSON")
+
+def config_from_args(args):
+    return MockConfig(args.latency, args.tokens_per_sec, args.chunk_tokens, args.error_429, args.error_500,
+                      args.retry_after_ms, args.page_kb, args.products, args.malformed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock OpenAI server for benchmarks")
+    parser.add_argument("--port", type=int, default=8765)
+    add_config_args(parser)
+    args = parser.parse_args()
+    server, _ = start_server(config_from_args(args), args.port)
+    print(f"Mock OpenAI listening on http://127.0.0.1:{server.server_port}/v1")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
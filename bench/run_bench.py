@@ -0,0 +1,195 @@
+import argparse
+import concurrent.futures
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from mock_openai import add_config_args, config_from_args, start_server
+
+# End-to-end benchmark of the generation pipeline against the local mock server:
+# prompt build -> generate_business_package + hero image -> JSON parse -> placeholder
+# injection -> create_zip -> json.dumps (-> bulk catalog with --bulk-products), with N concurrent sessions per level.
+#
+#   python bench/run_bench.py --levels 1,4,16 --sessions 32 --baseline bench/baselines/default.json
+#   python bench/run_bench.py --save-baseline bench/baselines/default.json
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL = "gpt-5"
+API_KEY = "sk-bench"
+
+SESSIONS = [
+    {"name": "Harbor Stay", "industry": "Hospitality & Tourism", "business_model": "Hotel / Accommodation", "structure": "Multi Page",
+     "prod_name": "Deluxe Sea View Room", "final_attributes": ["Room Type", "Bed Config", "View", "Amenities", "Meal Plan"]},
+    {"name": "Threadline", "industry": "Retail & Consumer Goods", "business_model": "E-commerce Product", "structure": "Single Page",
+     "prod_name": "Linen Shirt", "final_attributes": ["Size", "Color", "Material", "Fit"]},
+    {"name": "CarePoint", "industry": "Healthcare & Medical Services", "business_model": "Telehealth", "structure": "Landing Page",
+     "prod_name": "Video Consultation", "final_attributes": ["Platform", "Duration", "Specialist"]},
+]
+
+# Relative change that counts as a regression when comparing against a baseline
+TOLERANCE = {"p95": 0.25, "throughput_per_s": 0.20, "peak_mem_mb": 0.30}
+
+
+def configure(base_url):
+    # Must run before the app modules are imported: they read their settings at import time
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ["BIZONBOARD_CACHE"] = "0"
+    os.environ.setdefault("BIZONBOARD_CHAT_RPM", "1000000")
+    os.environ.setdefault("BIZONBOARD_CHAT_TPM", "1000000000")
+    os.environ.setdefault("BIZONBOARD_IMAGE_RPM", "1000000")
+    os.environ.setdefault("BIZONBOARD_IMAGE_CONCURRENCY", "64")
+    os.environ.setdefault("BIZONBOARD_BACKOFF_BASE", "0.05")
+    sys.path.insert(0, ROOT)
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered) + 0.5) - 1))] if ordered else 0.0
+
+
+def run_session(index, stream, products=0):
+    import generation
+    import llm
+    data = SESSIONS[index % len(SESSIONS)]
+    session = f"bench-{index}"
+    stages = {}
+    started = t = time.perf_counter()
+
+    for section in generation.plan_sections(data):
+        generation.build_section_prompt(data, section)
+    stages["prompt_build"], t = time.perf_counter() - t, time.perf_counter()
+
+    future_image = llm.submit(generation.agenerate_dalle_image(API_KEY, generation.image_prompt(data), False, session))
+    on_section = (lambda key, value: None) if stream else None
+    structure_res, _ = generation.generate_business_package(API_KEY, MODEL, data, on_section, False, session)
+    hero_url = future_image.result()
+    stages["generate"], t = time.perf_counter() - t, time.perf_counter()
+    if "error" in structure_res: raise RuntimeError(structure_res["error"])
+
+    # The pipeline parses each streamed section once; replay that cost on the merged output
+    raw = json.dumps(structure_res)
+    generation.SectionStream(lambda key, value: None).feed(raw)
+    json.loads(raw)
+    stages["json_parse"], t = time.perf_counter() - t, time.perf_counter()
+
+    result = generation.finalize_package(structure_res, hero_url, data)
+    stages["inject"], t = time.perf_counter() - t, time.perf_counter()
+    generation.create_zip(result["ui_pages"])
+    stages["zip"], t = time.perf_counter() - t, time.perf_counter()
+    json.dumps(result, indent=2)
+    stages["json_dump"], t = time.perf_counter() - t, time.perf_counter()
+    if products:
+        import bulk
+        with tempfile.TemporaryDirectory() as out:
+            llm.run(bulk.agenerate_catalog(API_KEY, MODEL, data, products, out, use_cache=False, session=session))
+        stages["bulk"] = time.perf_counter() - t
+    return time.perf_counter() - started, stages
+
+def run_level(concurrency, sessions, stream, products=0):
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    latencies, stage_samples, errors = [], {}, []
+    started = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in concurrent.futures.as_completed([executor.submit(run_session, i, stream, products) for i in range(sessions)]):
+            try:
+                latency, stages = future.result()
+            except Exception as e:
+                errors.append(str(e))
+                continue
+            latencies.append(latency)
+            for stage, seconds in stages.items():
+                stage_samples.setdefault(stage, []).append(seconds)
+    wall = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "concurrency": concurrency,
+        "sessions": sessions,
+        "errors": len(errors),
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "throughput_per_s": len(latencies) / wall,
+        "peak_mem_mb": peak / 1024 / 1024,
+        "stages_ms_p50": {stage: percentile(samples, 50) * 1000 for stage, samples in stage_samples.items()},
+    }
+
+
+def compare(results, baseline):
+    # Returns human-readable regressions; lower is better except for throughput
+    if baseline.get("mock") != results["mock"] or baseline.get("stream") != results["stream"] or baseline.get("bulk_products", 0) != results["bulk_products"]:
+        print("⚠️ Baseline was recorded with a different mock configuration; comparison is indicative only.")
+    previous = {level["concurrency"]: level for level in baseline.get("levels", [])}
+    regressions = []
+    for level in results["levels"]:
+        base = previous.get(level["concurrency"])
+        if not base: continue
+        for metric, tolerance in TOLERANCE.items():
+            old, new = base[metric], level[metric]
+            worse = new < old * (1 - tolerance) if metric == "throughput_per_s" else new > old * (1 + tolerance)
+            if worse: regressions.append(f"N={level['concurrency']} {metric}: {old:.3f} -> {new:.3f}")
+    return regressions
+
+def print_table(results):
+    print(f"{'N':>4} {'ok':>5} {'err':>4} {'p50 s':>8} {'p95 s':>8} {'p99 s':>8} {'sess/s':>8} {'peak MB':>8}  local stages p50 (ms)")
+    for level in results["levels"]:
+        stages = " ".join(f"{k}={v:.1f}" for k, v in level["stages_ms_p50"].items() if k != "generate")
+        print(f"{level['concurrency']:>4} {level['sessions'] - level['errors']:>5} {level['errors']:>4} {level['p50']:>8.3f} {level['p95']:>8.3f} "
+              f"{level['p99']:>8.3f} {level['throughput_per_s']:>8.2f} {level['peak_mem_mb']:>8.1f}  {stages}")
+    print(f"Mock: {results['mock_requests']} | max RSS {results['max_rss_mb']:.0f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the generation pipeline against a local mock OpenAI server")
+    parser.add_argument("--levels", default="1,4,16", help="Comma-separated numbers of concurrent sessions")
+    parser.add_argument("--sessions", type=int, default=32, help="Sessions run per level")
+    parser.add_argument("--bulk-products", type=int, default=0, help="Also export a bulk catalog of this many products per session")
+    parser.add_argument("--stream", action="store_true", help="Use the streaming path (SectionStream) instead of blocking completions")
+    parser.add_argument("--out", default=os.path.join(ROOT, "bench", "results", "latest.json"))
+    parser.add_argument("--baseline", help="Baseline JSON to compare against; exits 1 on regression")
+    parser.add_argument("--save-baseline", help="Write this run as the new baseline")
+    add_config_args(parser)
+    args = parser.parse_args()
+
+    cfg = config_from_args(args)
+    server, stats = start_server(cfg)
+    configure(f"http://127.0.0.1:{server.server_port}/v1")
+    try:
+        run_session(0, args.stream, args.bulk_products)  # Warm up imports, the event loop and the connection pool
+    except Exception:
+        pass  # Injected faults may hit the warm-up too; only the measured levels count
+
+    levels = [run_level(int(n), args.sessions, args.stream, args.bulk_products) for n in args.levels.split(",")]
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "stream": args.stream,
+        "bulk_products": args.bulk_products,
+        "mock": cfg.as_dict(),
+        "mock_requests": dict(stats.counts),
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "levels": levels,
+    }
+    print_table(results)
+
+    for path in filter(None, [args.out, args.save_baseline]):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f))
+        for line in regressions:
+            print(f"❌ Regression {line}")
+        if regressions: sys.exit(1)
+        print("✅ No regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+# Startup benchmark: how long a fresh worker takes to show the first wizard message, and how long a new
+# session takes on a worker that is already up. Each cold sample is a new Python process running app.py
+# through Streamlit's AppTest; nothing leaves the machine (the warm-up is off unless --warmup).
+#
+#   python bench/startup.py --runs 5 --baseline bench/baselines/startup.json
+#   python bench/startup.py --save-baseline bench/baselines/startup.json
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "app.py")
+WELCOME = "BizOnboard Builder"  # in the first assistant message
+# Imports the wizard's first screens must not pay for
+HEAVY_MODULES = ("openai", "httpx", "tiktoken", "PIL", "pyarrow")
+
+# Relative change that counts as a regression when comparing against a baseline
+TOLERANCE = {"cold_p50_s": 0.25, "app_cold_p50_s": 0.30, "session_p50_s": 0.30}
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered) + 0.5) - 1))] if ordered else 0.0
+
+
+def child(sessions):
+    # Runs inside the measured process; prints one JSON line. Times are from process start (set by the parent).
+    started = float(os.environ["BIZONBOARD_BENCH_T0"])
+    from streamlit.testing.v1 import AppTest
+    imported = time.time()
+
+    def new_session():
+        t = time.time()
+        at = AppTest.from_file(APP, default_timeout=60)
+        at.secrets["OPENAI_API_KEY"] = "sk-bench"
+        at.run()
+        if at.exception: raise RuntimeError(at.exception[0].value)
+        if not any(WELCOME in md.value for md in at.markdown): raise RuntimeError("no wizard message after the first run")
+        return t, time.time()
+
+    t, ready = new_session()
+    sample = {"streamlit_import_s": imported - started, "app_cold_s": ready - t, "cold_s": ready - started,
+              "heavy_modules": [name for name in HEAVY_MODULES if name in sys.modules]}
+    sample["session_s"] = [end - begin for begin, end in (new_session() for _ in range(sessions))]
+    print(json.dumps(sample))
+
+
+def measure(runs, sessions, warmup):
+    env = {**os.environ, "BIZONBOARD_WARMUP": "1" if warmup else "0", "BIZONBOARD_METRICS_PORT": "0"}
+    samples = []
+    with tempfile.TemporaryDirectory() as tmp:
+        # Fresh store and cache per benchmark, so restored sessions or a large cache never skew the numbers
+        env.update(BIZONBOARD_STORE=os.path.join(tmp, "sessions.sqlite3"), BIZONBOARD_CACHE_PATH=os.path.join(tmp, "cache.sqlite3"))
+        for _ in range(runs):
+            env["BIZONBOARD_BENCH_T0"] = repr(time.time())
+            out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", "--sessions", str(sessions)],
+                                 cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+            samples.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    sessions_s = [s for sample in samples for s in sample["session_s"]]
+    return {
+        "cold_p50_s": percentile([s["cold_s"] for s in samples], 50),
+        "cold_max_s": max(s["cold_s"] for s in samples),
+        "streamlit_import_p50_s": percentile([s["streamlit_import_s"] for s in samples], 50),
+        "app_cold_p50_s": percentile([s["app_cold_s"] for s in samples], 50),
+        "session_p50_s": percentile(sessions_s, 50),
+        "session_p95_s": percentile(sessions_s, 95),
+        "heavy_modules": sorted({name for s in samples for name in s["heavy_modules"]}),
+    }
+
+
+def compare(results, baseline):
+    regressions = [f"{metric}: {baseline[metric]:.3f} -> {results[metric]:.3f}"
+                   for metric, tolerance in TOLERANCE.items() if metric in baseline and results[metric] > baseline[metric] * (1 + tolerance)]
+    if new := set(results["heavy_modules"]) - set(baseline.get("heavy_modules", [])):
+        regressions.append(f"imported at startup: {', '.join(sorted(new))}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark worker cold start and new-session time for the Streamlit app")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes to start")
+    parser.add_argument("--sessions", type=int, default=5, help="New sessions timed in each process after the first one")
+    parser.add_argument("--warmup", action="store_true", help="Leave the OpenAI warm-up on (opens a real connection)")
+    parser.add_argument("--out", default=os.path.join(ROOT, "bench", "results", "startup.json"))
+    parser.add_argument("--baseline", help="Baseline JSON to compare against; exits 1 on regression")
+    parser.add_argument("--save-baseline", help="Write this run as the new baseline")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child: return child(args.sessions)
+
+    results = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(), "platform": platform.platform(),
+               "runs": args.runs, "warmup": args.warmup, **measure(args.runs, args.sessions, args.warmup)}
+    print(f"Cold start to first wizard message: p50 {results['cold_p50_s']:.3f}s (max {results['cold_max_s']:.3f}s) = "
+          f"streamlit import {results['streamlit_import_p50_s']:.3f}s + first app run {results['app_cold_p50_s']:.3f}s")
+    print(f"New session on a running worker: p50 {results['session_p50_s'] * 1000:.0f} ms, p95 {results['session_p95_s'] * 1000:.0f} ms")
+    print(f"Heavy modules imported at startup: {', '.join(results['heavy_modules']) or 'none'}")
+
+    for path in filter(None, [args.out, args.save_baseline]):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f))
+        for line in regressions:
+            print(f"❌ Regression {line}")
+        if regressions: sys.exit(1)
+        print("✅ No regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import asyncio
+import csv
+import itertools
+import json
+import os
+import re
+
+import metrics
+from generation import agenerate_section
+
+# Bulk catalog mode: the model writes the catalog's categories and attribute value domains once, then
+# product seeds in batches; every variant row (SKU, options, price, stock) is expanded locally and streamed
+# to disk, so neither the prompts nor memory grow with the size of the variant matrix.
+
+# --- Configuration ---
+BULK_BATCH_SIZE = int(os.environ.get("BIZONBOARD_BULK_BATCH_SIZE", "25"))  # product seeds per request
+BULK_MAX_PRODUCTS = int(os.environ.get("BIZONBOARD_BULK_MAX_PRODUCTS", "5000"))
+BULK_DEFAULT_STOCK = 10  # starting stock for every generated variant
+CATALOG_FORMATS = ("ndjson", "csv", "parquet")
+CATALOG_FILES = {"ndjson": "products.ndjson", "csv": "variants.csv", "parquet": "variants.parquet"}
+
+
+# --- PLANNING ---
+def plan_batches(categories, size, batch_size=BULK_BATCH_SIZE):
+    # Spreads size products over the categories as evenly as possible, at most batch_size per request
+    batches = []
+    for i, category in enumerate(categories):
+        share = size // len(categories) + (i < size % len(categories))
+        for batch in range(-(-share // batch_size)):
+            batches.append((category, batch + 1, min(batch_size, share - batch * batch_size)))
+    return batches
+
+def domain_codes(values):
+    # Short, unique SKU codes for one domain's values: "Navy Blue" -> "NAV", a second "Navy" -> "NAV2"
+    codes, seen = [], {}
+    for value in values:
+        code = (re.sub(r"[^A-Za-z0-9]", "", value).upper() or "X")[:3]
+        seen[code] = seen.get(code, 0) + 1
+        codes.append(code if seen[code] == 1 else f"{code}{seen[code]}")
+    return codes
+
+def prepare_domains(domains):
+    # {attribute: [(value, code, price_delta)]}; empty and repeated domains are dropped
+    prepared = {}
+    for domain in domains:
+        values = list(dict.fromkeys(v["value"] for v in domain.get("values", []) if v.get("value")))
+        if not values or domain["name"] in prepared: continue
+        deltas = {}
+        for v in domain["values"]: deltas.setdefault(v["value"], v.get("price_delta") or 0)  # the first occurrence wins, as for values
+        prepared[domain["name"]] = [(value, code, deltas[value]) for value, code in zip(values, domain_codes(values))]
+    return prepared
+
+
+# --- EXPANSION ---
+def expand_variants(product, domains):
+    # The cartesian product of the product's variant domains, one row at a time
+    names = [name for name in dict.fromkeys(product["variant_attributes"]) if name in domains]
+    for combo in itertools.product(*(domains[name] for name in names)):
+        yield {"sku": "-".join([product["id"], *(code for _, code, _ in combo)]), "product_id": product["id"],
+               **{name: value for name, (value, _, _) in zip(names, combo)},
+               "price": round(product["price"] + sum(delta for _, _, delta in combo), 2), "stock": BULK_DEFAULT_STOCK}
+
+
+class CatalogWriter:
+    # Appends products and their variant rows to the export files batch by batch
+    def __init__(self, out_dir, attributes, formats=("ndjson", "csv")):
+        os.makedirs(out_dir, exist_ok=True)
+        self.paths = {fmt: os.path.join(out_dir, CATALOG_FILES[fmt]) for fmt in formats}
+        self.columns = ["sku", "product_id", *attributes, "price", "stock"]
+        self.products = self.variants = 0
+        self._ndjson = open(self.paths["ndjson"], "w", encoding="utf-8") if "ndjson" in formats else None
+        self._csv_file = open(self.paths["csv"], "w", encoding="utf-8", newline="") if "csv" in formats else None
+        self._csv = csv.DictWriter(self._csv_file, self.columns, restval="") if self._csv_file else None
+        if self._csv: self._csv.writeheader()
+        self._parquet = None
+        if "parquet" in formats:
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError:
+                self.close()
+                raise RuntimeError("Parquet export needs the pyarrow package (pip install pyarrow).")
+            self._pa = pa
+            self._schema = pa.schema([(c, pa.float64() if c == "price" else pa.int64() if c == "stock" else pa.string()) for c in self.columns])
+            self._parquet = pq.ParquetWriter(self.paths["parquet"], self._schema)
+
+    def write(self, products, domains):
+        columns = {c: [] for c in self.columns} if self._parquet else None
+        for product in products:
+            if self._ndjson: self._ndjson.write(json.dumps(product, ensure_ascii=False) + "\n")
+            for row in expand_variants(product, domains):
+                self.variants += 1
+                if self._csv: self._csv.writerow(row)
+                if columns is not None:
+                    for c in self.columns: columns[c].append(row.get(c))
+        self.products += len(products)
+        # One row group per batch keeps the Parquet writer's memory bounded too
+        if columns and columns["sku"]: self._parquet.write_table(self._pa.table(columns, schema=self._schema))
+
+    def close(self):
+        for f in (self._ndjson, self._csv_file, self._parquet):
+            if f: f.close()
+
+
+# --- GENERATION ---
+async def agenerate_catalog(api_key, model_name, data, size, out_dir, formats=("ndjson", "csv"), use_cache=True, session=None):
+    # Returns {"products", "variants", "files"}; seed batches run concurrently and are written in order as they land
+    size = min(size, BULK_MAX_PRODUCTS)
+    part, _ = await agenerate_section(api_key, model_name, data, "domains", None, use_cache, session)
+    if "error" in part: raise RuntimeError(part["error"])
+    domains = prepare_domains(part["domains"])
+    batches = plan_batches(list(dict.fromkeys(part["categories"])) or ["General"], size)
+    tasks = [asyncio.ensure_future(agenerate_section(api_key, model_name, data, f"seeds:{batch}:{count}:{category}", None, use_cache, session))
+             for category, batch, count in batches]
+
+    writer = CatalogWriter(out_dir, list(domains), formats)
+    names = set()
+    try:
+        for (category, _, count), task in zip(batches, tasks):
+            seeds, _ = await task
+            if "error" in seeds: raise RuntimeError(seeds["error"])
+            products = []
+            for seed in seeds["seeds"][:count]:
+                # Batches never see each other, so a repeated name gets a numbered suffix
+                name, n = seed["name"], 1
+                while name in names:
+                    n += 1
+                    name = f"{seed['name']} {n}"
+                names.add(name)
+                products.append({"id": f"P{writer.products + len(products) + 1:05d}", "name": name, "category": category,
+                                 "description": seed["description"], "price": seed["base_price"],
+                                 "variant_attributes": [a for a in dict.fromkeys(seed["variant_attributes"]) if a in domains]})
+            with metrics.span("bulk_expand", category):
+                await asyncio.to_thread(writer.write, products, domains)
+    finally:
+        for task in tasks: task.cancel()  # no-op for finished ones
+        writer.close()
+    metrics.inc("bizonboard_bulk_products_total", writer.products)
+    return {"products": writer.products, "variants": writer.variants, "files": writer.paths}
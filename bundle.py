@@ -0,0 +1,187 @@
+import hashlib
+import html
+import io
+import os
+import re
+import tempfile
+import time
+import urllib.request
+
+import metrics
+from cache import make_key, result_cache
+
+# Post-processing for the downloadable site: the preview keeps self-contained pages, the ZIP gets one
+# shared stylesheet, minified pages and the hero image shipped locally as resized WebP renditions.
+
+# --- Configuration ---
+ASSET_DIR = os.environ.get("BIZONBOARD_ASSET_DIR", os.path.join(".cache", "assets"))  # images by content hash
+ASSET_MAX_BYTES = int(os.environ.get("BIZONBOARD_ASSET_MAX_BYTES", str(512 * 1024 * 1024)))  # oldest files go first
+ASSET_TTL = 30 * 24 * 3600  # how long a URL -> file mapping is kept; outlives the DALL·E URL itself
+FETCH_TIMEOUT = float(os.environ.get("BIZONBOARD_FETCH_TIMEOUT", "20"))
+FETCH_MAX_BYTES = 20 * 1024 * 1024
+FETCH_RETRY_AFTER = 300  # seconds before a URL that failed to download is tried again
+HERO_WIDTHS = (480, 768, 1024)  # WebP renditions for srcset; never upscaled
+HERO_SIZES = "(max-width: 800px) 100vw, 50vw"  # matches the two-column hero in templates.py
+WEBP_QUALITY = 80
+IMAGE_TYPES = {"image/png": "png", "image/jpeg": "jpg", "image/webp": "webp", "image/gif": "gif", "image/svg+xml": "svg"}
+
+_failed = {}  # url -> time of the last failed download
+
+
+# --- MINIFY ---
+def minify_css(css):
+    # Quoted strings (content: " , ", url("a b")) are kept as written; only the code between them is squeezed
+    strings = r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')"""
+    css = re.sub(strings + r"|/\*.*?\*/", lambda m: m.group(1) or "", css, flags=re.S)
+    parts = re.split(strings, css)
+    for i in range(0, len(parts), 2):
+        code = re.sub(r"\s+", " ", parts[i])
+        code = re.sub(r"\s*([{};,>])\s*", r"\1", code)
+        code = re.sub(r"([^\s(]):\s+", r"\1:", code)  # "color: red" -> "color:red"; leaves selectors like "a :hover" alone
+        parts[i] = code.replace(";}", "}")
+    return "".join(parts).strip()
+
+def minify_html(page):
+    page = re.sub(r"<!--(?!\[).*?-->", "", page, flags=re.S)
+    if re.search(r"<(pre|textarea|script)\b", page, re.I): return page  # whitespace matters inside these
+    # A run of whitespace renders as one space, so it is collapsed rather than dropped: between inline
+    # elements ("<b>a</b>\n<i>b</i>") it is the visible gap between the words
+    return re.sub(r"\s+", " ", page).strip()
+
+
+# --- ASSETS ---
+def _asset_path(name):
+    return os.path.join(ASSET_DIR, name)
+
+def _write_asset(name, payload):
+    # Several sessions may package the same image at once; each writes its own temp file and the rename wins
+    os.makedirs(ASSET_DIR, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=ASSET_DIR, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(payload)
+    os.replace(tmp, _asset_path(name))
+    _prune()
+
+def _prune():
+    files = []
+    for entry in os.scandir(ASSET_DIR):
+        try:
+            if not entry.name.endswith(".tmp"): files.append((entry.stat().st_mtime, entry.stat().st_size, entry.path))
+        except FileNotFoundError:
+            pass
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= ASSET_MAX_BYTES: break
+        total -= size
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def fetch_asset(url):
+    # Downloads an image once and keeps it under its content hash; returns {"sha", "ext"} or None.
+    # Also called right after the hero is generated, so the download is usually done before packaging.
+    if not url or not url.startswith(("http://", "https://")): return None
+    if time.time() - _failed.get(url, 0) < FETCH_RETRY_AFTER: return None  # the prefetch already gave up on it
+    key = make_key("asset", url)
+    asset = result_cache.get(key)
+    if asset and os.path.exists(_asset_path(f"{asset['sha']}.{asset['ext']}")):
+        os.utime(_asset_path(f"{asset['sha']}.{asset['ext']}"))
+        return asset
+    try:
+        # urllib follows redirects and raises on HTTP errors; the timeout applies to the connect and to each read
+        with metrics.span("asset_fetch"), urllib.request.urlopen(url, timeout=FETCH_TIMEOUT) as response:
+            ext = IMAGE_TYPES.get(response.headers.get("content-type", "").split(";")[0].strip())
+            payload = response.read(FETCH_MAX_BYTES + 1) if ext else b""
+        if not ext or len(payload) > FETCH_MAX_BYTES: raise ValueError("not a usable image")
+    except (OSError, ValueError):
+        # The page keeps the remote URL
+        for stale, at in list(_failed.items()):
+            if time.time() - at >= FETCH_RETRY_AFTER: _failed.pop(stale, None)
+        _failed[url] = time.time()
+        return None
+    asset = {"sha": hashlib.sha256(payload).hexdigest(), "ext": ext}
+    if not os.path.exists(_asset_path(f"{asset['sha']}.{ext}")): _write_asset(f"{asset['sha']}.{ext}", payload)
+    result_cache.put(key, asset, ttl=ASSET_TTL)
+    return asset
+
+def image_variants(asset):
+    # [(width, path)] WebP renditions, narrowest first, cached next to the original. Without Pillow (or for
+    # formats it cannot read) the original alone is shipped, with width None.
+    original = _asset_path(f"{asset['sha']}.{asset['ext']}")
+    try:
+        from PIL import Image
+    except ImportError:
+        return [(None, original)]
+    variants = []
+    try:
+        with Image.open(original) as image:
+            for width in HERO_WIDTHS:
+                width = min(width, image.width)
+                if variants and width == variants[-1][0]: break
+                name = f"{asset['sha']}-{width}.webp"
+                if not os.path.exists(_asset_path(name)):
+                    with metrics.span("webp"):
+                        resized = image.copy()
+                        resized.thumbnail((width, image.height * width // image.width + 1), Image.LANCZOS)
+                        _write_asset(name, _encode_webp(resized))
+                variants.append((width, _asset_path(name)))
+    except OSError:
+        return [(None, original)]
+    return variants
+
+def _encode_webp(image):
+    buffer = io.BytesIO()
+    image.save(buffer, "WEBP", quality=WEBP_QUALITY, method=6)
+    return buffer.getvalue()
+
+
+# --- BUNDLE ---
+def _img_tags(page, hero_url, hero_attrs):
+    # The hero gets src/srcset from the local renditions. The first image of a page is what the visitor
+    # sees first, so it is fetched eagerly at high priority; every later image loads lazily.
+    seen = 0
+
+    def rewrite(match):
+        nonlocal seen
+        tag = match.group(0)
+        src = re.search(r'\bsrc="([^"]*)"', tag)
+        if hero_attrs and src and hero_url in (src.group(1), html.unescape(src.group(1))):
+            tag = tag.replace(src.group(0), hero_attrs)
+        if "loading=" not in tag:
+            extra = ' fetchpriority="high" decoding="async"' if seen == 0 else ' loading="lazy" decoding="async"'
+            tag = re.sub(r"\s*(/?)>$", lambda end: f"{extra}{end.group(1)}>", tag)
+        seen += 1
+        return tag
+    return re.sub(r"<img\b[^>]*>", rewrite, page)
+
+def optimize_site(pages, hero_url=None):
+    # Returns (pages, files): each page minified and linked to one shared stylesheet, plus the stylesheet and
+    # image files to ship next to them as (name in the zip, bytes or path on disk)
+    with metrics.span("optimize"):
+        styles = {}
+        for title, page in pages.items():
+            blocks = re.findall(r"<style[^>]*>(.*?)</style>", page, flags=re.S | re.I)
+            styles[title] = minify_css("\n".join(blocks)) if blocks and re.search(r"</head>", page, re.I) else None
+        sheets = sorted({css for css in styles.values() if css})
+        # One sheet for the whole site in the usual case; pages that differ get their own, named by content
+        names = {css: "styles.css" if len(sheets) == 1 else f"styles-{hashlib.sha256(css.encode('utf-8')).hexdigest()[:8]}.css" for css in sheets}
+        files = [(name, css.encode("utf-8")) for css, name in names.items()]
+
+        hero_attrs = None
+        asset = fetch_asset(hero_url)
+        if asset:
+            variants = image_variants(asset)
+            shipped = [(width, f"assets/hero-{asset['sha'][:12]}-{width}.webp" if width else f"assets/hero-{asset['sha'][:12]}.{asset['ext']}", path)
+                       for width, path in variants]
+            files += [(name, path) for _, name, path in shipped]
+            hero_attrs = f'src="{shipped[-1][1]}"'
+            if shipped[-1][0]: hero_attrs += f' srcset="{", ".join(f"{name} {width}w" for width, name, _ in shipped)}" sizes="{HERO_SIZES}"'
+
+        optimized = {}
+        for title, page in pages.items():
+            if styles[title]:
+                page = re.sub(r"<style[^>]*>.*?</style>", "", page, flags=re.S | re.I)
+                page = re.sub(r"</head>", f'<link rel="stylesheet" href="{names[styles[title]]}">\n</head>', page, count=1, flags=re.I)
+            optimized[title] = minify_html(_img_tags(page, hero_url, hero_attrs))
+    return optimized, files
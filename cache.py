@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+# --- Configuration ---
+CACHE_PATH = os.environ.get("BIZONBOARD_CACHE_PATH", os.path.join(".cache", "bizonboard.sqlite3"))
+CACHE_ENABLED = os.environ.get("BIZONBOARD_CACHE", "1").lower() not in ("0", "false", "off")
+CACHE_MAX_ENTRIES = int(os.environ.get("BIZONBOARD_CACHE_MAX_ENTRIES", "500"))
+CACHE_MAX_BYTES = int(os.environ.get("BIZONBOARD_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+CACHE_TTL = float(os.environ.get("BIZONBOARD_CACHE_TTL", str(7 * 24 * 3600)))
+
+
+# --- KEYS ---
+def normalize(value):
+    # Whitespace and dict ordering must not change the key; list order does (it changes the prompt)
+    if isinstance(value, dict): return {str(k): normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)): return [normalize(v) for v in value]
+    if isinstance(value, str): return " ".join(value.split())
+    return value
+
+def make_key(*parts):
+    blob = json.dumps([normalize(p) for p in parts], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+# --- STORE ---
+class ResultCache:
+    def __init__(self, path=CACHE_PATH, max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES, ttl=CACHE_TTL, enabled=CACHE_ENABLED):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.enabled = enabled
+        self.hits = self.misses = 0
+        self._lock = threading.Lock()
+        self._db = None
+
+    def _conn(self):
+        if self._db is None:
+            if os.path.dirname(self.path): os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")  # several workers on one host share the file
+            self._db.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB, size INTEGER, expires REAL, accessed REAL)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+        return self._db
+
+    def get(self, key):
+        if not self.enabled: return None
+        now = time.time()
+        with self._lock:
+            try:
+                db = self._conn()
+                row = db.execute("SELECT value, expires FROM entries WHERE key = ?", (key,)).fetchone()
+                if row and row[1] > now:
+                    db.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+                    db.commit()
+                    self.hits += 1
+                    return json.loads(zlib.decompress(row[0]))
+                if row:
+                    db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    db.commit()
+            except sqlite3.Error:
+                self._rollback()  # a locked or broken cache file is a miss, never a failed generation
+            self.misses += 1
+        return None
+
+    def put(self, key, value, ttl=None):
+        if not self.enabled: return
+        blob = zlib.compress(json.dumps(value).encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            try:
+                db = self._conn()
+                db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)", (key, blob, len(blob), now + (ttl or self.ttl), now))
+                self._evict(db, now)
+                db.commit()
+            except sqlite3.Error:
+                self._rollback()  # the result is still returned, just not cached
+
+    def _rollback(self):
+        try:
+            if self._db is not None: self._db.rollback()
+        except sqlite3.Error:
+            pass
+
+    def _evict(self, db, now):
+        db.execute("DELETE FROM entries WHERE expires <= ?", (now,))
+        count, size = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        # Least recently used first, until both limits hold again
+        for key, entry_size in db.execute("SELECT key, size FROM entries ORDER BY accessed").fetchall():
+            if count <= self.max_entries and size <= self.max_bytes: break
+            db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            count, size = count - 1, size - entry_size
+
+    def clear(self):
+        with self._lock:
+            try:
+                self._conn().execute("DELETE FROM entries")
+                self._conn().commit()
+            except sqlite3.Error:
+                self._rollback()  # nothing cleared; the next call tries again
+                return
+            self.hits = self.misses = 0
+
+    def stats(self):
+        # None while the cache file cannot be read; the sidebar shows no numbers rather than an error
+        with self._lock:
+            try:
+                count, size = self._conn().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+            except sqlite3.Error:
+                self._rollback()
+                return None
+        return {"hits": self.hits, "misses": self.misses, "entries": count, "bytes": size}
+
+
+# Shared by every session in the process
+result_cache = ResultCache()
@@ -0,0 +1,248 @@
+import collections
+import glob
+import gzip
+import hashlib
+import json
+import marshal
+import math
+import os
+import re
+
+# --- CONSTANTS ---
+BUSINESS_TYPES = [
+    "Service-Based Business", "Professional Service Business", "E-commerce Store",
+    "Product-Based Business", "Asset / Transaction-Based Business", "Digital Product / Service Business"
+]
+
+STRUCTURE_OPTIONS = ["Single Page", "Multi Page", "Landing Page"]
+
+SEGMENT_OPTIONS = [
+    "B2C (Individual Consumers)", "B2B (Businesses / Companies)",
+    "B2B2C (Businesses serving end customers)", "D2C (Direct to Consumer)", "Niche / Enthusiast Audience"
+]
+
+# --- Configuration ---
+# Industries, business models and attributes live in data files (.json or .json.gz); more files or
+# directories can be layered on top of the bundled one, separated by os.pathsep. Later files win.
+CATALOG_PATHS = os.environ.get("BIZONBOARD_CATALOG", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "catalog.json"))
+CATALOG_INDEX = os.environ.get("BIZONBOARD_CATALOG_INDEX", os.path.join(".cache", "catalog.index"))
+INDEX_VERSION = "1"  # bump when the index layout below changes
+SUGGESTION_LIMIT = 24  # options offered at step 12 before the user searches
+PREFIX_LEN = 6  # word prefixes indexed for typeahead; longer queries are checked against the words
+FUZZY_MIN = 0.3  # trigram similarity a misspelt query needs to match
+FUZZY_CANDIDATES = 200  # best trigram overlaps scored exactly
+
+
+# --- SOURCES ---
+def _read_doc(path):
+    with (gzip.open(path, "rt", encoding="utf-8") if path.endswith(".gz") else open(path, encoding="utf-8")) as f:
+        return json.load(f)
+
+def catalog_files(paths=CATALOG_PATHS):
+    files = []
+    for path in filter(None, paths.split(os.pathsep)):
+        if os.path.isdir(path): files += sorted(glob.glob(os.path.join(path, "*.json")) + glob.glob(os.path.join(path, "*.json.gz")))
+        else: files.append(path)
+    return files
+
+def merge_docs(docs):
+    # {"fallback_model": m, "industries": {name: {"models": [...], "pool_from": m}}, "models": {name: {"defaults": [...] | {sub: [...]}, "pool": [...]}}}
+    merged = {"fallback_model": None, "industries": {}, "models": {}}
+    for doc in docs:
+        merged["fallback_model"] = doc.get("fallback_model") or merged["fallback_model"]
+        for name, entry in doc.get("industries", {}).items():
+            industry = merged["industries"].setdefault(name, {"models": []})
+            industry["models"] += [m for m in entry.get("models", []) if m not in industry["models"]]
+            if entry.get("pool_from"): industry["pool_from"] = entry["pool_from"]
+        for name, entry in doc.get("models", {}).items():
+            merged["models"][name] = {**merged["models"].get(name, {}), **entry}
+    return merged
+
+
+# --- INDEX ---
+def _normalize(text):
+    return " ".join(re.sub(r"[^0-9a-z]+", " ", text.lower()).split())
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class Catalog:
+    # Everything the wizard looks up, precomputed once: plain dict lookups for industries and models,
+    # ranked suggestion lists, and prefix/trigram postings for attribute search. Attribute ids are
+    # assigned in rank order, so every posting list is already ranked.
+    def __init__(self, doc):
+        self.fallback_model = doc.get("fallback_model") or "General Service"
+        self.industries = list(doc["industries"])
+        self.models_by_industry = {name: list(entry["models"]) for name, entry in doc["industries"].items()}
+        self.defaults = {name: entry["defaults"] for name, entry in doc["models"].items() if entry.get("defaults")}
+        self.pools = {name: list(entry["pool"]) for name, entry in doc["models"].items() if entry.get("pool")}
+        self.pool_from = {name: entry["pool_from"] for name, entry in doc["industries"].items() if entry.get("pool_from")}
+
+        # Popularity: how many models list an attribute (as a default it counts double)
+        score = collections.Counter()
+        for model, defaults in self.defaults.items():
+            for attr in self._flatten(defaults): score[attr] += 2
+        for model, pool in self.pools.items():
+            for attr in pool: score[attr] += 1
+        self.names = sorted(score, key=lambda attr: (-score[attr], attr))
+        self.ids = {attr: i for i, attr in enumerate(self.names)}
+
+        self.words, self.prefixes, self.trigrams = [], collections.defaultdict(list), collections.defaultdict(list)
+        for i, attr in enumerate(self.names):
+            norm = _normalize(attr)
+            self.words.append(tuple(norm.split()))
+            for prefix in sorted({word[:k] for word in norm.split() for k in range(1, min(len(word), PREFIX_LEN) + 1)}):
+                self.prefixes[prefix].append(i)
+            for gram in sorted(_trigrams(norm)): self.trigrams[gram].append(i)
+        self.prefixes, self.trigrams = dict(self.prefixes), dict(self.trigrams)
+
+        # Related attributes per industry: what its other models use, most common first
+        self.related = {}
+        for industry, models in self.models_by_industry.items():
+            counts = collections.Counter(attr for model in models for attr in self._flatten(self.defaults.get(model, [])) + self.pools.get(model, []))
+            self.related[industry] = sorted(counts, key=lambda attr: (-counts[attr], self.ids[attr]))
+
+    @classmethod
+    def from_state(cls, state):
+        # Rebuilds a catalog from vars() of one that was indexed before, without running __init__ again
+        catalog = cls.__new__(cls)
+        catalog.__dict__.update(state)
+        return catalog
+
+    @staticmethod
+    def _flatten(defaults):
+        return [attr for group in defaults.values() for attr in group] if isinstance(defaults, dict) else list(defaults)
+
+    # --- LOOKUPS ---
+    def models_for(self, industry):
+        return self.models_by_industry.get(industry, [self.fallback_model, "General Product"])
+
+    def attribute_options(self, model_key):
+        # A flat default list, or {sub type: defaults} for models that ask for a category first
+        return self.defaults.get(model_key) or self.defaults.get(self.fallback_model, [])
+
+    def suggestion_pool(self, model_key, industry):
+        if model_key in self.pools: return self.pools[model_key]
+        return self.pools.get(self.pool_from.get(industry), self.pools.get(self.fallback_model, []))
+
+    def suggestions(self, model_key, industry, defaults=(), limit=SUGGESTION_LIMIT):
+        # The defaults, the model's own pool, then what the industry's other models use; same order every run
+        ranked = dict.fromkeys([*defaults, *self.suggestion_pool(model_key, industry), *self.related.get(industry, [])])
+        return list(ranked)[:max(limit, len(defaults))]
+
+    def is_known(self, attr):
+        return attr in self.ids
+
+    # --- SEARCH ---
+    def _match(self, i, query, tokens):
+        # 0 exact, 1 name starts with the query, 2 every query word starts a word of the name, None otherwise
+        words = self.words[i]
+        if not all(any(word.startswith(token) for word in words) for token in tokens): return None
+        name = " ".join(words)
+        return 0 if name == query else 1 if name.startswith(query) else 2
+
+    def search(self, query, limit=10, boost=()):
+        # Typeahead over every attribute: exact, then name prefix, then word prefixes; trigram similarity
+        # only when nothing matches (typos). Ties go to boosted attributes (the current model's), then popularity.
+        query = _normalize(query)
+        if not query: return []
+        tokens = query.split()
+        hits = {}
+        counts = [0, 0, 0]
+        for i in self.prefixes.get(tokens[0][:PREFIX_LEN], ()):
+            match = self._match(i, query, tokens)
+            if match is None: continue
+            hits[i] = match
+            counts[match] += 1
+            if counts[0] + counts[1] >= limit: break  # postings are in rank order; nothing later can place higher
+        for attr in boost:
+            i = self.ids.get(attr)
+            if i is not None and i not in hits and (match := self._match(i, query, tokens)) is not None: hits[i] = match
+        if not hits:
+            grams = sorted(_trigrams(query), key=lambda gram: len(self.trigrams.get(gram, ())))
+            # A match shares at least FUZZY_MIN of the query's trigrams, so it has one of its rarest ones
+            shared = collections.Counter(i for gram in grams[:len(grams) - math.ceil(FUZZY_MIN * len(grams)) + 1] for i in self.trigrams.get(gram, ()))
+            for i, _ in shared.most_common(FUZZY_CANDIDATES):
+                other = _trigrams(" ".join(self.words[i]))
+                similarity = len(other.intersection(grams)) / len(other.union(grams))
+                if similarity >= FUZZY_MIN: hits[i] = 4 - similarity
+        boost = set(boost)
+        ranked = sorted(hits, key=lambda i: (int(hits[i]), self.names[i] not in boost, hits[i], i))
+        return [self.names[i] for i in ranked[:limit]]
+
+
+def _signature(files):
+    # The data files and this module's own code: a change to either invalidates the index
+    stats = [(path, os.path.getsize(path), os.stat(path).st_mtime_ns) for path in files]
+    with open(__file__, "rb") as f:
+        code = hashlib.sha256(f.read()).hexdigest()
+    return hashlib.sha256(json.dumps([INDEX_VERSION, code, stats]).encode("utf-8")).hexdigest()
+
+def load_catalog(paths=CATALOG_PATHS, index_path=CATALOG_INDEX):
+    # Loads the prebuilt index when it matches the data files; otherwise builds it and saves it for the next start.
+    # The index holds only plain dicts, lists and strings (marshal), never pickled objects.
+    files = catalog_files(paths)
+    signature = _signature(files)
+    try:
+        with open(index_path, "rb") as f:
+            stored, state = marshal.load(f)
+        if stored == signature and isinstance(state, dict): return Catalog.from_state(state)
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+    catalog = Catalog(merge_docs(_read_doc(path) for path in files))
+    try:
+        if os.path.dirname(index_path): os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        with open(index_path + ".tmp", "wb") as f:
+            marshal.dump((signature, vars(catalog)), f)
+        os.replace(index_path + ".tmp", index_path)
+    except (OSError, ValueError):
+        pass  # read-only deploys just rebuild on every start
+    return catalog
+
+
+# Shared by every session in the process
+catalog = load_catalog()
+INDUSTRY_OPTIONS = catalog.industries
+
+
+# --- LOOKUPS ---
+def default_attributes(model_key, sub_type=None):
+    # The "Use Suggested" set from step 12; models with sub-types fall back to their first one
+    attr_options = catalog.attribute_options(model_key)
+    if isinstance(attr_options, dict):
+        return list(attr_options.get(sub_type) or next(iter(attr_options.values())))
+    return list(attr_options)
+
+# --- VALIDATION ---
+REQUIRED_FIELDS = ("name", "industry", "business_model", "structure", "prod_name")
+
+def validate_record(record):
+    # Checks a headless onboarding record against the same tables the wizard offers.
+    # Returns (data, errors); a missing final_attributes is filled with the suggested set.
+    data = dict(record)
+    errors = [f"missing '{field}'" for field in REQUIRED_FIELDS if not str(data.get(field) or "").strip()]
+    industry, model_key = data.get("industry"), data.get("business_model")
+
+    if industry and industry not in catalog.models_by_industry:
+        errors.append(f"unknown industry '{industry}'")
+    elif industry and model_key and model_key not in catalog.models_by_industry[industry]:
+        errors.append(f"business_model '{model_key}' is not offered for '{industry}'")
+    if data.get("structure") and data["structure"] not in STRUCTURE_OPTIONS:
+        errors.append(f"unknown structure '{data['structure']}'")
+    if data.get("segment") and data["segment"] not in SEGMENT_OPTIONS:
+        errors.append(f"unknown segment '{data['segment']}'")
+    if data.get("business_type") and data["business_type"] not in BUSINESS_TYPES:
+        errors.append(f"unknown business_type '{data['business_type']}'")
+
+    attrs = data.get("final_attributes")
+    if attrs is None:
+        data["final_attributes"] = default_attributes(model_key, data.get("attribute_category"))
+    elif not isinstance(attrs, list) or not attrs or not all(isinstance(a, str) for a in attrs):
+        errors.append("'final_attributes' must be a non-empty list of strings")
+    else:
+        # Step 12 can search the whole catalog, so any attribute it knows is accepted
+        unknown = [a for a in attrs if not catalog.is_known(a)]
+        if unknown: errors.append(f"attributes not in the catalog: {', '.join(unknown)}")
+    return data, errors
@@ -0,0 +1,387 @@
+import asyncio
+import concurrent.futures
+import html
+import io
+import json
+import queue
+import zipfile
+
+import llm
+import metrics
+from cache import result_cache, make_key
+from templates import render_site
+from prompts import (PROMPT_VERSION, PRODUCT_PLACEHOLDER, PAGE_LAYOUTS, PromptBudgetError, page_filename,
+                     section_fields, build_section_prompt, section_messages, prompt_cache_key)
+
+# --- PACKAGING ---
+PRECOMPRESSED = (".webp", ".png", ".jpg", ".gif", ".parquet")
+
+def create_zip(pages_dict, files=(), fileobj=None):
+    # files are (name in the zip, bytes or path on disk) pairs; paths are copied in chunks so a bulk catalog
+    # never sits in memory. With fileobj the archive is written there instead of being returned.
+    zip_buffer = fileobj or io.BytesIO()
+    with metrics.span("zip"), zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
+        for page_title, html_content in pages_dict.items():
+            zip_file.writestr(page_filename(page_title), html_content)
+        for name, payload in files:
+            # Images and Parquet are compressed already; deflating them again only costs time
+            compress = zipfile.ZIP_STORED if name.lower().endswith(PRECOMPRESSED) else zipfile.ZIP_DEFLATED
+            if isinstance(payload, bytes): zip_file.writestr(name, payload, compress)
+            else: zip_file.write(payload, name, compress)
+    return None if fileobj else zip_buffer.getvalue()
+
+# --- STREAMING JSON ---
+NESTED_KEYS = ("ui_pages", "page_content")  # maps of page name -> page; each entry is handed on by itself
+
+class SectionStream:
+    # Scans the streamed JSON incrementally and hands each top-level section
+    # (and each page entry) to on_section as soon as its value is complete.
+    def __init__(self, on_section):
+        self.on_section = on_section
+        self.buf = ""
+        self.stack = []  # one frame per open container
+        self.in_str = self.esc = self.str_is_key = False
+        self.str_start = None
+
+    def feed(self, chunk):
+        start = len(self.buf)
+        self.buf += chunk
+        for i in range(start, len(self.buf)):
+            self._step(i, self.buf[i])
+
+    def _step(self, i, c):
+        if self.in_str:
+            if self.esc: self.esc = False
+            elif c == "\\": self.esc = True
+            elif c == '"':
+                self.in_str = False
+                self._close_string(i)
+            return
+        if not self.stack:
+            # Skip markdown fences / preamble before the root object
+            if c == "{": self.stack.append(self._frame(True, True))
+            return
+        frame = self.stack[-1]
+        if c == '"':
+            self.in_str = True
+            self.str_start = i
+            self.str_is_key = frame["obj"] and frame["expect"] == "key"
+            if not self.str_is_key: frame["start"] = i
+        elif c in "{[":
+            if frame["start"] is None: frame["start"] = i
+            track = len(self.stack) == 1 and frame["key"] in NESTED_KEYS and c == "{"
+            self.stack.append(self._frame(c == "{", track))
+        elif c in "}]":
+            self._close_scalar(frame, i)
+            self.stack.pop()
+            if self.stack: self._emit(self.stack[-1], i + 1)
+        elif c == ":":
+            frame["expect"] = "value"
+        elif c == ",":
+            self._close_scalar(frame, i)
+            frame["expect"] = "key"
+        elif not c.isspace() and frame["start"] is None:
+            frame["start"] = i
+
+    def _frame(self, obj, track):
+        return {"obj": obj, "track": track, "key": None, "expect": "key", "start": None}
+
+    def _close_string(self, i):
+        frame = self.stack[-1]
+        if self.str_is_key: frame["key"] = json.loads(self.buf[self.str_start:i + 1])
+        else: self._emit(frame, i + 1)
+
+    def _close_scalar(self, frame, i):
+        if frame["start"] is not None: self._emit(frame, i)
+
+    def _emit(self, frame, end):
+        raw, frame["start"] = self.buf[frame["start"]:end], None
+        if not frame["track"] or (len(self.stack) == 1 and frame["key"] in NESTED_KEYS): return
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            return  # Malformed section; the final parse reports it
+        if len(self.stack) == 1: self.on_section(frame["key"], value)
+        else: self.on_section(self.stack[0]["key"], {frame["key"]: value})
+
+# --- IMAGE CONFIG ---
+IMAGE_FIELDS = ("name", "industry", "business_model")  # what image_prompt reads
+IMAGE_MODEL = "dall-e-3"
+IMAGE_CACHE_TTL = 50 * 60  # DALL·E URLs expire after an hour
+IMAGE_ERROR_URL = "https://placehold.co/1024x1024/222/FFF?text=Image+Generation+Error"
+
+# --- IMAGE ---
+def image_prompt(data):
+    return f"A photorealistic, 4k hero image for a {data.get('business_model')} business named {data['name']}. Context: {data['industry']}."
+
+async def agenerate_dalle_image(api_key, image_prompt, use_cache=True, session=None):
+    cache_key = make_key("dalle", IMAGE_MODEL, image_prompt)
+    if use_cache and (cached := result_cache.get(cache_key)):
+        return cached
+    if not use_cache: return await _produce_image(api_key, image_prompt, session) or IMAGE_ERROR_URL
+    url, produced = await join_inflight(cache_key, lambda: _produce_image(api_key, image_prompt, session))
+    if produced and url: result_cache.put(cache_key, url, ttl=IMAGE_CACHE_TTL)
+    return url or IMAGE_ERROR_URL
+
+async def _produce_image(api_key, image_prompt, session):
+    # None on failure, so a failed image is never cached
+    client = llm.get_async_client(api_key)
+    try:
+        with metrics.span("openai_image"):
+            response = await llm.get_scheduler("image").call(
+                lambda: client.images.generate(model=IMAGE_MODEL, prompt=image_prompt, size="1024x1024", quality="standard", n=1), session)
+        url = response.data[0].url
+        metrics.record_image(IMAGE_MODEL)
+    except Exception:
+        return None
+    return url
+
+def replay_sections(result, on_section):
+    for key, value in result.items():
+        if key in NESTED_KEYS:
+            for page_name, page in value.items():
+                on_section(key, {page_name: page})
+        else:
+            on_section(key, value)
+
+# --- IN-FLIGHT REQUESTS ---
+_inflight = {}  # cache key -> [task, waiters]; only touched on the shared loop
+
+async def join_inflight(key, produce):
+    # Returns (result, produced_here). Waiters share one task; it is cancelled only when the last of them is.
+    entry = _inflight.get(key)
+    produced = entry is None
+    if produced:
+        entry = _inflight[key] = [asyncio.ensure_future(produce()), 0]
+        entry[0].add_done_callback(lambda _: _inflight.pop(key, None))
+    entry[1] += 1
+    try:
+        return await asyncio.shield(entry[0]), produced
+    except asyncio.CancelledError:
+        if entry[1] == 1: entry[0].cancel()
+        raise
+    finally:
+        entry[1] -= 1
+
+# --- OUTPUT SCHEMAS ---
+REPAIR_ATTEMPTS = 2
+SECTION_KEYS = {
+    "taxonomy": ("business_details", "categories_tree"),
+    "products": ("attribute_sets", "sample_products"),
+    "banner": ("marketing_banner_html",),
+    "domains": ("categories", "domains"),
+    "seeds": ("seeds",)
+}
+
+def _object(properties):
+    # Strict structured outputs need every property required and no extras
+    return {"type": "object", "properties": properties, "required": list(properties), "additionalProperties": False}
+
+def _list(items):
+    return {"type": "array", "items": items}
+
+STRING, INTEGER, NUMBER = {"type": "string"}, {"type": "integer"}, {"type": "number"}
+CATEGORY_SCHEMA = _object({"id": INTEGER, "name": STRING, "children": _list({"$ref": "#/$defs/category"})})
+SECTION_PROPERTIES = {
+    "business_details": _object({"name": STRING, "model": STRING, "structure": STRING}),
+    "categories_tree": _list({"$ref": "#/$defs/category"}),
+    "attribute_sets": _list(_object({"name": STRING, "attributes": _list(STRING)})),
+    "sample_products": _list(_object({
+        "id": STRING, "name": STRING, "description": STRING, "price": NUMBER,
+        # Free-form maps are not allowed in strict mode; name/value pairs are folded back into a dict
+        "attributes": _list(_object({"name": STRING, "value": STRING})),
+        "variants": _list(_object({"sku": STRING, "spec": STRING, "stock": INTEGER})),
+        "pricing_rules": _list(_object({"name": STRING, "rule": STRING}))
+    })),
+    "marketing_banner_html": STRING,
+    "categories": _list(STRING),
+    "domains": _list(_object({"name": STRING, "values": _list(_object({"value": STRING, "price_delta": NUMBER}))})),
+    "seeds": _list(_object({"name": STRING, "description": STRING, "base_price": NUMBER, "variant_attributes": _list(STRING)}))
+}
+# Pages are copy only; templates.py turns it into HTML
+PAGE_CONTENT_SCHEMA = _object({
+    "headline": STRING, "subheadline": STRING, "cta_label": STRING,
+    "sections": _list(_object({"heading": STRING, "body": STRING, "items": _list(STRING)}))
+})
+
+def section_keys(section):
+    return SECTION_KEYS.get(section.split(":", 1)[0], ("page_content",))
+
+def section_schema(section, keys=None):
+    if section.startswith("page:"):
+        schema = _object({"page_content": _object({section.split(":", 1)[1]: PAGE_CONTENT_SCHEMA})})
+    else:
+        schema = _object({k: SECTION_PROPERTIES[k] for k in (keys or section_keys(section))})
+        if "categories_tree" in schema["properties"]: schema["$defs"] = {"category": CATEGORY_SCHEMA}
+    # The API only accepts [a-zA-Z0-9_-] names; seed batches share one schema, so their category stays out of it
+    name = "".join(c if c.isascii() and c.isalnum() else "_" for c in ("seeds" if section.startswith("seeds:") else section))
+    return {"type": "json_schema", "json_schema": {"name": f"bizonboard_{name}"[:64], "strict": True, "schema": schema}}
+
+def parse_section(content):
+    # Whole-document parse first; on failure keep every top-level key that is complete and valid on its own
+    content = (content or "").strip().replace("```json", "").replace("```", "")
+    try:
+        result = json.loads(content)
+    except ValueError:
+        result = {}
+
+        def keep(key, value):
+            if key in NESTED_KEYS: result.setdefault(key, {}).update(value)
+            else: result[key] = value
+        SectionStream(keep).feed(content)
+    if not isinstance(result, dict): return {}
+    for product in result.get("sample_products") or []:
+        if isinstance(product, dict) and isinstance(product.get("attributes"), list):
+            product["attributes"] = {a.get("name"): a.get("value") for a in product["attributes"] if isinstance(a, dict)}
+    return result
+
+def missing_keys(result, section):
+    if section.startswith("page:"):
+        pages = result.get("page_content")
+        return [] if isinstance(pages, dict) and isinstance(pages.get(section.split(":", 1)[1]), dict) else ["page_content"]
+    return [k for k in section_keys(section) if k not in result]
+
+# --- SECTION JOBS ---
+def plan_sections(data):
+    pages = PAGE_LAYOUTS.get(data.get('structure', 'Single Page'), ["Home"])
+    return ["taxonomy", "products", "banner"] + [f"page:{page}" for page in pages]
+
+def section_ready(data, section):
+    return all(data.get(field) for field in section_fields(section))
+
+def stale_sections(old, new):
+    # What an edit invalidates: SECTION_FIELDS and IMAGE_FIELDS map each wizard input to the outputs that read it
+    # (segment feeds none, prod_name only the products; pages get it locally)
+    changed = {field for field in set(old) | set(new) if old.get(field) != new.get(field)}
+    stale = [section for section in plan_sections(new) if changed.intersection(section_fields(section))]
+    return stale + (["hero image"] if changed.intersection(IMAGE_FIELDS) else [])
+
+def split_sections(result, sections):
+    # The parts of a finished package that belong to each section, so an edit can reuse them as they are
+    parts = {}
+    for section in sections:
+        if section == "hero image":
+            if result.get("generated_image_url"): parts[section] = result["generated_image_url"]
+        elif section.startswith("page:"):
+            page = section.split(":", 1)[1]
+            if page in result.get("page_content", {}): parts[section] = {"page_content": {page: result["page_content"][page]}}
+        elif all(k in result for k in section_keys(section)):
+            parts[section] = {k: result[k] for k in section_keys(section)}
+    return parts
+
+def section_key(model_name, data, section):
+    return make_key("section", PROMPT_VERSION, model_name, section, {k: data.get(k) for k in section_fields(section)})
+
+async def agenerate_section(api_key, model_name, data, section, on_section=None, use_cache=True, session=None):
+    await llm.load_tokenizer()  # prompt building counts tokens
+    try:
+        with metrics.span("prompt_build", section):
+            prompt = build_section_prompt(data, section)
+    except PromptBudgetError as e:
+        return {"error": str(e)}, ""
+    cache_key = section_key(model_name, data, section)
+    if use_cache and (cached := result_cache.get(cache_key)):
+        if on_section: replay_sections(cached, on_section)
+        return cached, prompt
+    if not use_cache: return await _produce_section(api_key, model_name, section, prompt, on_section, session), prompt
+
+    # The same section already in flight (a speculative run, another session) is joined instead of requested twice
+    result, produced = await join_inflight(cache_key, lambda: _produce_section(api_key, model_name, section, prompt, on_section, session))
+    if "error" in result: return result, prompt
+    if produced: result_cache.put(cache_key, result)
+    elif on_section: replay_sections(result, on_section)
+    return result, prompt
+
+async def _produce_section(api_key, model_name, section, prompt, on_section, session):
+    client = llm.get_async_client(api_key)
+    scheduler = llm.get_scheduler("chat")
+
+    async def request(messages, response_format, on_section):
+        if on_section is None:
+            response = await client.chat.completions.create(model=model_name, messages=messages, response_format=response_format,
+                                                            prompt_cache_key=prompt_cache_key(section))
+            metrics.record_usage(model_name, response.usage)
+            return response.choices[0].message.content
+        # The stream is consumed inside the scheduled call so it keeps its slot until the last token
+        stream = SectionStream(on_section)
+        async for chunk in await client.chat.completions.create(model=model_name, messages=messages, response_format=response_format,
+                                                                 prompt_cache_key=prompt_cache_key(section), stream=True,
+                                                                 stream_options={"include_usage": True}):
+            if chunk.choices and chunk.choices[0].delta.content:
+                stream.feed(chunk.choices[0].delta.content)
+            if getattr(chunk, "usage", None):
+                metrics.record_usage(model_name, chunk.usage)
+        return stream.buf
+
+    messages = section_messages(prompt)
+    tokens = llm.estimate_tokens(messages[0]["content"] + prompt)
+    try:
+        with metrics.span("openai_chat", section):
+            content = await scheduler.call(lambda: request(messages, section_schema(section), on_section), session, tokens)
+        with metrics.span("json_parse", section):
+            result = parse_section(content)
+
+        # Keep whatever parsed and ask again only for the keys that did not
+        for _ in range(REPAIR_ATTEMPTS):
+            missing = missing_keys(result, section)
+            if not missing: break
+            metrics.inc("bizonboard_section_repairs_total", section=section.split(":")[0])
+            repair = [messages[0], {"role": "user", "content": prompt + f"Return ONLY these keys: {', '.join(missing)}.\n"}]
+            with metrics.span("openai_chat", f"{section} (repair)"):
+                content = await scheduler.call(lambda: request(repair, section_schema(section, missing), None), session, tokens)
+            with metrics.span("json_parse", section):
+                repaired = {k: v for k, v in parse_section(content).items() if k in missing}
+            if on_section: replay_sections(repaired, on_section)
+            result.update(repaired)
+    except Exception as e:
+        return {"error": f"{section}: {e}"}
+    if missing := missing_keys(result, section):
+        return {"error": f"{section}: could not parse {', '.join(missing)} from the model output"}
+    return result
+
+def merge_sections(parts):
+    merged, nested, prompts = {}, {}, []
+    for part, prompt in parts:
+        prompts.append(prompt)
+        if "error" in part:
+            return part, "\n".join(prompts)
+        for key, value in part.items():
+            if key in NESTED_KEYS: nested.setdefault(key, {}).update(value)
+            else: merged[key] = value
+    return {**merged, **nested}, "\n".join(prompts)
+
+def run_sections(api_key, model_name, data, on_section=None, use_cache=True, session=None):
+    # Jobs run concurrently on the shared event loop; streamed sections are handed to on_section on the calling thread.
+    events = queue.Queue()
+    emit = (lambda key, value: events.put((key, value))) if on_section else None
+    futures = [llm.submit(agenerate_section(api_key, model_name, data, section, emit, use_cache, session)) for section in plan_sections(data)]
+
+    def drain():
+        while on_section and not events.empty():
+            on_section(*events.get())
+
+    pending = set(futures)
+    while pending:
+        _, pending = concurrent.futures.wait(pending, timeout=0.1, return_when=concurrent.futures.FIRST_COMPLETED)
+        drain()
+    drain()
+    return merge_sections([f.result() for f in futures])
+
+def generate_business_package(api_key, model_name, data, on_section=None, use_cache=True, session=None):
+    return run_sections(api_key, model_name, data, on_section, use_cache, session)
+
+async def agenerate_business_package(api_key, model_name, data, use_cache=True, session=None):
+    parts = await asyncio.gather(*(agenerate_section(api_key, model_name, data, section, None, use_cache, session) for section in plan_sections(data)))
+    return merge_sections(parts)
+
+def fill_placeholders(page_html, dalle_url, product_name):
+    # The placeholder sits in escaped text and attributes alike, so the name is escaped for both
+    return page_html.replace("HERO_IMAGE_PLACEHOLDER", dalle_url).replace(PRODUCT_PLACEHOLDER, html.escape(product_name or "", quote=True))
+
+def finalize_package(structure_res, dalle_url, data):
+    # Render pages from the structured copy, then inject Image and Product Name
+    with metrics.span("render_pages"):
+        pages = render_site(structure_res, data)
+    with metrics.span("inject"):
+        final_pages = {page_name: fill_placeholders(page_html, dalle_url, data.get("prod_name")) for page_name, page_html in pages.items()}
+    return {**structure_res, "ui_pages": final_pages, "generated_image_url": dalle_url}
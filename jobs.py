@@ -0,0 +1,192 @@
+import asyncio
+import os
+import threading
+import time
+
+import llm
+import metrics
+from bundle import fetch_asset
+from cache import make_key
+from generation import (NESTED_KEYS, IMAGE_FIELDS, IMAGE_MODEL, IMAGE_ERROR_URL, plan_sections, section_ready, section_key, image_prompt,
+                        agenerate_section, agenerate_dalle_image, replay_sections, merge_sections, finalize_package)
+from prompts import PROMPT_FIELDS
+
+# --- Configuration ---
+JOB_DEADLINE = float(os.environ.get("BIZONBOARD_JOB_DEADLINE", "300"))  # seconds; whatever is unfinished by then is cancelled
+REQUIRED_SECTIONS = ("taxonomy", "products")  # without these there is no catalog to deliver
+JOB_TTL = float(os.environ.get("BIZONBOARD_JOB_TTL", "900"))  # finished jobs are kept this long for late polls
+HERO_FALLBACK_URL = "https://placehold.co/1024x1024/222/FFF?text=Hero+Image+Unavailable"
+
+_lock = threading.Lock()
+_jobs = {}  # session id -> Job
+_speculative = {}  # session id -> {"inputs": key, "tasks": {cache key: future}}
+
+
+class Job:
+    # One generation run for one session. It lives on the shared event loop rather than in the
+    # Streamlit script, so reruns and refreshes only poll it and never start the calls twice.
+    def __init__(self, session, key, sections, deadline):
+        self.session = session
+        self.key = key
+        self.sections = sections
+        self.status = "running"  # running | done | partial | failed | cancelled
+        self.started = time.time()
+        self.deadline = self.started + deadline
+        self.finished_at = None
+        self.completed = set()
+        self.hero_url = None
+        self.result = self.error = self.trace = None
+        self.prompt = ""
+        self.missing = []  # what the deadline cut off, for partial results
+        self.parts = {}  # finished sections (and "hero image"), so a retry can reuse them without the cache
+        self.future = None
+        self._streamed = {}
+        self._lock = threading.Lock()
+
+    def emit(self, key, value):
+        # Section output as it arrives, for the live preview
+        with self._lock:
+            if key in NESTED_KEYS: self._streamed[key] = {**self._streamed.get(key, {}), **value}
+            else: self._streamed[key] = value
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._streamed)
+
+    def progress(self):
+        # Sections plus the hero image
+        return (len(self.completed) + (self.hero_url is not None)) / (len(self.sections) + 1)
+
+    def position(self):
+        return llm.queue_position(self.session)
+
+    def done(self):
+        return self.status != "running"
+
+
+# --- RUNNER ---
+async def _section(job, api_key, model_name, data, section, use_cache, stream, reused=None):
+    if reused: metrics.inc("bizonboard_sections_reused_total", section=section.split(":")[0])
+    part = (reused, "") if reused else await agenerate_section(api_key, model_name, data, section, job.emit if stream else None, use_cache, job.session)
+    if "error" not in part[0]:
+        replay_sections(part[0], job.emit)
+        job.completed.add(section)
+    return part
+
+async def _image(job, api_key, data, use_cache, reused=None):
+    # An edit that leaves IMAGE_FIELDS alone keeps the hero; bundle.fetch_asset has the file even after the URL expires
+    if reused in (HERO_FALLBACK_URL, IMAGE_ERROR_URL): reused = None  # a placeholder; try for a real image again
+    if reused: metrics.inc("bizonboard_sections_reused_total", section="hero image")
+    job.hero_url = reused or await agenerate_dalle_image(api_key, image_prompt(data), use_cache, job.session)
+    # Start downloading it for the site bundle while the sections are still being written; not awaited,
+    # so it never counts against the deadline
+    if job.hero_url: asyncio.get_running_loop().run_in_executor(None, fetch_asset, job.hero_url)
+    return job.hero_url
+
+async def _run(job, api_key, model_name, data, use_cache, stream, reuse):
+    with metrics.run_trace() as trace:
+        try:
+            image = asyncio.ensure_future(_image(job, api_key, data, use_cache, reuse.get("hero image")))
+            tasks = {section: asyncio.ensure_future(_section(job, api_key, model_name, data, section, use_cache, stream, reuse.get(section)))
+                     for section in job.sections}
+            try:
+                await asyncio.wait(tasks.values(), timeout=max(0.0, job.deadline - time.time()))
+                # The hero image only gets whatever time is left before the deadline
+                await asyncio.wait([image], timeout=max(0.0, job.deadline - time.time()))
+            except asyncio.CancelledError:
+                job.status = "cancelled"
+                for task in [image, *tasks.values()]: task.cancel()
+                raise
+            late = [section for section, task in tasks.items() if not task.done()]
+            hero = image.result() if image.done() else None
+            for task in [image, *tasks.values()]: task.cancel()  # no-op for finished tasks
+            job.parts = {section: task.result()[0] for section, task in tasks.items()
+                         if section not in late and not task.exception() and "error" not in task.result()[0]}
+            if hero and hero != IMAGE_ERROR_URL: job.parts["hero image"] = hero
+
+            structure_res, job.prompt = merge_sections([tasks[section].result() for section in job.sections if section not in late])
+            if "error" in structure_res:
+                job.error, job.status = structure_res["error"], "failed"
+            elif any(section in late for section in REQUIRED_SECTIONS):
+                job.error, job.status = f"Timed out after {JOB_DEADLINE:.0f}s before the catalog data was ready.", "failed"
+            else:
+                job.missing = late + ([] if hero else ["hero image"])
+                job.result = finalize_package(structure_res, hero or HERO_FALLBACK_URL, data)
+                job.status = "partial" if job.missing else "done"
+        except Exception as e:
+            job.error, job.status = str(e), "failed"
+        finally:
+            job.trace = trace.summary()
+            job.finished_at = time.time()
+            metrics.inc("bizonboard_jobs_total", status=job.status)
+
+
+# --- REGISTRY ---
+def job_key(model_name, data):
+    return make_key("job", model_name, {k: data.get(k) for k in PROMPT_FIELDS})
+
+def _prune():
+    cutoff = time.time() - JOB_TTL
+    for session, job in list(_jobs.items()):
+        if job.finished_at and job.finished_at < cutoff: del _jobs[session]
+    for session, entry in list(_speculative.items()):
+        if not entry["tasks"]: del _speculative[session]
+
+def start(session, api_key, model_name, data, use_cache=True, stream=True, reuse=None):
+    # Returns the session's job for these inputs, starting one only if there is none yet.
+    # reuse maps sections to parts of an earlier package (after an edit), and "hero image" to its URL; those are
+    # not requested again.
+    key = job_key(model_name, data)
+    with _lock:
+        _prune()
+        job = _jobs.get(session)
+        if job and job.key == key and job.status != "cancelled": return job
+        if job and job.future: job.future.cancel()
+        job = _jobs[session] = Job(session, key, plan_sections(data), JOB_DEADLINE)
+        job.future = llm.submit(_run(job, api_key, model_name, data, use_cache, stream, reuse or {}))
+    return job
+
+def cancel(session):
+    # Stops the session's in-flight calls (queued ones leave the scheduler queue) and forgets the job
+    with _lock:
+        job = _jobs.pop(session, None)
+    cancel_speculation(session)
+    if job and not job.done():
+        job.status = "cancelled"
+        job.future.cancel()
+    return job
+
+
+# --- SPECULATION ---
+def speculate(session, api_key, model_name, data):
+    # Starts every section (and the hero image) whose inputs the wizard already has, so step 20 finds them
+    # cached or joins them in flight. Work for answers that have changed since is cancelled.
+    data = dict(data)
+    inputs = job_key(model_name, data)
+    with _lock:
+        entry = _speculative.setdefault(session, {"inputs": None, "tasks": {}})
+        if entry["inputs"] == inputs: return
+        entry["inputs"] = inputs
+        wanted = {section_key(model_name, data, section): (lambda section=section: agenerate_section(api_key, model_name, data, section, None, True, session))
+                  for section in plan_sections(data) if section_ready(data, section)}
+        if all(data.get(field) for field in IMAGE_FIELDS):
+            wanted[make_key("dalle", IMAGE_MODEL, image_prompt(data))] = lambda: agenerate_dalle_image(api_key, image_prompt(data), True, session)
+
+        tasks = entry["tasks"]
+        for key in set(tasks) - set(wanted):
+            # The done callback pops finished ones on the loop thread, without _lock
+            if (future := tasks.pop(key, None)) is None: continue
+            future.cancel()
+            metrics.inc("bizonboard_speculative_total", outcome="discarded")
+        for key, start in wanted.items():
+            if key in tasks: continue
+            tasks[key] = future = llm.submit(start())
+            future.add_done_callback(lambda f, key=key: tasks.pop(key, None) if tasks.get(key) is f else None)
+            metrics.inc("bizonboard_speculative_total", outcome="started")
+
+def cancel_speculation(session):
+    # Stops the session's speculative calls, e.g. once the cache is off and nothing would read their results
+    with _lock:
+        entry = _speculative.pop(session, None)
+    for future in list(entry["tasks"].values()) if entry else ():
+        future.cancel()
@@ -0,0 +1,209 @@
+import asyncio
+import collections
+import os
+import random
+import threading
+import time
+import warnings
+
+import metrics
+
+# openai (and the HTTP stack under it) is imported on first use: it is the slowest import in the app and the wizard's
+# first screens never need it
+
+# --- Configuration ---
+MAX_CONNECTIONS = int(os.environ.get("BIZONBOARD_MAX_CONNECTIONS", "64"))
+MAX_KEEPALIVE = int(os.environ.get("BIZONBOARD_MAX_KEEPALIVE", "32"))
+KEEPALIVE_EXPIRY = float(os.environ.get("BIZONBOARD_KEEPALIVE_EXPIRY", "120"))
+CONNECT_TIMEOUT = float(os.environ.get("BIZONBOARD_CONNECT_TIMEOUT", "10"))
+READ_TIMEOUT = float(os.environ.get("BIZONBOARD_READ_TIMEOUT", "300"))
+
+# Scheduler limits; set them a little under the organisation's OpenAI limits
+CHAT_RPM = float(os.environ.get("BIZONBOARD_CHAT_RPM", "500"))
+CHAT_TPM = float(os.environ.get("BIZONBOARD_CHAT_TPM", "450000"))
+CHAT_CONCURRENCY = int(os.environ.get("BIZONBOARD_CHAT_CONCURRENCY", "24"))
+IMAGE_RPM = float(os.environ.get("BIZONBOARD_IMAGE_RPM", "7"))
+IMAGE_CONCURRENCY = int(os.environ.get("BIZONBOARD_IMAGE_CONCURRENCY", "4"))
+MAX_RETRIES = int(os.environ.get("BIZONBOARD_MAX_RETRIES", "5"))
+BACKOFF_BASE = float(os.environ.get("BIZONBOARD_BACKOFF_BASE", "1.0"))
+BACKOFF_MAX = float(os.environ.get("BIZONBOARD_BACKOFF_MAX", "60"))
+
+_lock = threading.Lock()
+_loop = None
+_clients = {}
+_schedulers = {}
+_encoding = None  # tiktoken encoding, False when unavailable
+_encoding_lock = threading.Lock()  # one load, however many threads ask at once
+
+
+# --- EVENT LOOP ---
+def get_loop():
+    # One loop per process, running on a daemon thread. Streamlit reruns and sessions
+    # come and go, but the loop (and the connection pool bound to it) stays.
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="bizonboard-llm", daemon=True).start()
+        return _loop
+
+def submit(coro):
+    # Schedule a coroutine on the shared loop; returns a concurrent.futures.Future
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+def run(coro):
+    return submit(coro).result()
+
+
+# --- CLIENT ---
+def get_async_client(api_key):
+    # Created once per key and only ever used from the shared loop
+    with _lock:
+        client = _clients.get(api_key)
+        if client is None:
+            from openai import DEFAULT_CONNECTION_LIMITS, AsyncOpenAI, DefaultAsyncHttpxClient, Timeout
+            # Limits and Timeout come from the SDK's own HTTP stack (httpx or httpx2, depending on the openai release)
+            limits = type(DEFAULT_CONNECTION_LIMITS)(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_KEEPALIVE, keepalive_expiry=KEEPALIVE_EXPIRY)
+            http_client = DefaultAsyncHttpxClient(limits=limits, timeout=Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT))
+            # Retries are owned by the Scheduler so they respect the shared rate limits
+            client = _clients[api_key] = AsyncOpenAI(api_key=api_key, http_client=http_client, max_retries=0)
+        return client
+
+
+# --- SCHEDULER ---
+class TokenBucket:
+    def __init__(self, per_minute):
+        self.rate = per_minute / 60.0
+        self.capacity = per_minute
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+
+    async def acquire(self, amount):
+        amount = min(amount, self.capacity)
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return
+            await asyncio.sleep((amount - self.tokens) / self.rate)
+
+
+def retry_delay(error, attempt):
+    # Honour the server's Retry-After when it sends one, otherwise full-jitter exponential backoff
+    from openai import APIStatusError
+    headers = error.response.headers if isinstance(error, APIStatusError) else {}
+    try:
+        if headers.get("retry-after-ms"): return float(headers["retry-after-ms"]) / 1000 + random.uniform(0, 0.25)
+        if headers.get("retry-after"): return float(headers["retry-after"]) + random.uniform(0, 0.25)
+    except ValueError:
+        pass
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+def is_retryable(error):
+    from openai import APIConnectionError, APIStatusError, RateLimitError
+    if isinstance(error, RateLimitError): return getattr(error, "code", None) != "insufficient_quota"
+    if isinstance(error, APIStatusError): return error.status_code >= 500
+    return isinstance(error, APIConnectionError)
+
+
+class Scheduler:
+    # Every OpenAI call in the process goes through one of these. Requests are admitted
+    # strictly in arrival order (asyncio.Lock wakes waiters FIFO), so no session can starve
+    # another, and the head of the queue holds the lock until its rate budget and a slot are free.
+    def __init__(self, name, rpm, concurrency, tpm=None):
+        self.name = name
+        self.rpm = TokenBucket(rpm)
+        self.tpm = TokenBucket(tpm) if tpm else None
+        self.slots = asyncio.Semaphore(concurrency)
+        self.admission = asyncio.Lock()
+        self.waiting = collections.deque()  # session ids, in queue order
+        self.retries = 0
+
+    async def call(self, request, session=None, tokens=0):
+        attempt = 0
+        while True:
+            with metrics.span("queue_wait", self.name):
+                await self._admit(session, tokens)
+            try:
+                return await request()
+            except Exception as e:
+                if attempt >= MAX_RETRIES or not is_retryable(e): raise
+                delay, error = retry_delay(e, attempt), type(e).__name__
+            finally:
+                self.slots.release()
+            attempt += 1
+            self.retries += 1
+            metrics.inc("bizonboard_openai_retries_total", api=self.name, error=error)
+            await asyncio.sleep(delay)
+
+    async def _admit(self, session, tokens):
+        self.waiting.append(session)
+        try:
+            async with self.admission:
+                await self.rpm.acquire(1)
+                if self.tpm: await self.tpm.acquire(tokens)
+                await self.slots.acquire()
+        finally:
+            self.waiting.remove(session)
+
+    def position(self, session):
+        # 1-based place of the session's first queued request, 0 when it is not waiting
+        for i, waiting in enumerate(list(self.waiting)):
+            if waiting == session: return i + 1
+        return 0
+
+
+def get_scheduler(kind):
+    with _lock:
+        if kind not in _schedulers:
+            _schedulers[kind] = Scheduler(kind, CHAT_RPM, CHAT_CONCURRENCY, CHAT_TPM) if kind == "chat" else Scheduler(kind, IMAGE_RPM, IMAGE_CONCURRENCY)
+        return _schedulers[kind]
+
+def queue_position(session):
+    return max(get_scheduler("chat").position(session), get_scheduler("image").position(session))
+
+def count_tokens(text):
+    # Exact with tiktoken installed, otherwise ~4 characters per token
+    global _encoding
+    if _encoding is None:
+        with _encoding_lock:
+            if _encoding is None:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding("o200k_base")
+                except Exception as e:
+                    _encoding = False
+                    warnings.warn(f"tiktoken unavailable ({e}); prompt budgets and the TPM limit use a 4-characters-per-token estimate")
+    return len(_encoding.encode(text)) if _encoding else len(text) // 4 + 1
+
+async def load_tokenizer():
+    # The first load imports tiktoken and may download the encoding; on a worker thread, so the shared loop
+    # (and every session's stream) never waits for it. Free once loaded.
+    if _encoding is None: await asyncio.to_thread(count_tokens, "")
+
+def estimate_tokens(text, completion=4000):
+    # Budget for the TPM bucket: the prompt plus the expected completion
+    return count_tokens(text) + completion
+
+
+# --- WARM-UP ---
+WARMUP = os.environ.get("BIZONBOARD_WARMUP", "1").lower() not in ("0", "false", "no", "off")
+
+async def _warm_up(api_key, model_name):
+    # Pays for the openai import, the tokenizer load and DNS + TCP + TLS while the user is still on the wizard,
+    # not on the first generation. The import runs off the loop so it never stalls other sessions' streams.
+    loop = asyncio.get_running_loop()
+    tokenizer = asyncio.ensure_future(load_tokenizer())
+    client = await loop.run_in_executor(None, get_async_client, api_key)
+    try:
+        await client.models.retrieve(model_name, timeout=CONNECT_TIMEOUT)  # cheap request; the pooled connection stays open
+    except Exception:
+        pass  # a bad key or a network problem surfaces on the first real call, with its proper message
+    await tokenizer
+
+def warm_up(api_key, model_name):
+    # Non-blocking; returns the future, or None when disabled
+    if not WARMUP or not api_key: return None
+    return submit(_warm_up(api_key, model_name))
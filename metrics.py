@@ -0,0 +1,184 @@
+import contextlib
+import contextvars
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- Configuration ---
+METRICS_PORT = int(os.environ.get("BIZONBOARD_METRICS_PORT", "9108"))  # 0 disables the endpoint
+METRICS_HOST = os.environ.get("BIZONBOARD_METRICS_HOST", "127.0.0.1")  # the endpoint has no auth; 0.0.0.0 exposes it to scrapers elsewhere
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# USD per 1M tokens (input, cached input, output) and per image; override with BIZONBOARD_PRICE_<MODEL>=in,cached,out
+PRICES = {"gpt-5": (1.25, 0.125, 10.0)}
+IMAGE_PRICES = {"dall-e-3": 0.04}
+
+_lock = threading.Lock()
+_histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+_counters = {}    # (name, labels) -> value
+_server = None
+_current = contextvars.ContextVar("bizonboard_trace", default=None)
+
+
+def model_prices(model):
+    override = os.environ.get(f"BIZONBOARD_PRICE_{model.upper().replace('-', '_').replace('.', '_')}")
+    if override: return tuple(float(p) for p in override.split(","))
+    return PRICES.get(model, (0.0, 0.0, 0.0))
+
+
+# --- REGISTRY ---
+def observe(name, seconds, **labels):
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        series = _histograms.setdefault(key, [0] * (len(BUCKETS) + 2))
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound: series[i] += 1
+        series[-2] += seconds
+        series[-1] += 1
+
+def inc(name, value=1, **labels):
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _fmt_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs: return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+def render_prometheus():
+    lines = []
+    with _lock:
+        histograms, counters = dict((k, list(v)) for k, v in _histograms.items()), dict(_counters)
+    for name in sorted({k[0] for k in histograms}):
+        lines.append(f"# TYPE {name} histogram")
+        for (series_name, labels), series in sorted(histograms.items()):
+            if series_name != name: continue
+            for bound, count in zip(BUCKETS, series):
+                lines.append(f"{name}_bucket{_fmt_labels(labels, [('le', bound)])} {count}")
+            lines.append(f"{name}_bucket{_fmt_labels(labels, [('le', '+Inf')])} {series[-1]}")
+            lines.append(f"{name}_sum{_fmt_labels(labels)} {series[-2]}")
+            lines.append(f"{name}_count{_fmt_labels(labels)} {series[-1]}")
+    for name in sorted({k[0] for k in counters}):
+        lines.append(f"# TYPE {name} counter")
+        for (series_name, labels), value in sorted(counters.items()):
+            if series_name == name: lines.append(f"{name}{_fmt_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+# --- TRACES ---
+class Trace:
+    # Everything one generation run spent: stage timings, tokens and estimated cost.
+    # Set as the current trace, it follows the run into coroutines on the shared loop.
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = []
+        self.tokens = {}  # model -> [prompt, cached, completion]
+        self.images = {}  # model -> count
+        self._lock = threading.Lock()
+
+    def add_span(self, stage, seconds, detail=None):
+        with self._lock:
+            self.spans.append((stage, detail, seconds))
+
+    def add_tokens(self, model, prompt, completion, cached=0):
+        with self._lock:
+            totals = self.tokens.setdefault(model, [0, 0, 0])
+            totals[0] += prompt
+            totals[1] += cached
+            totals[2] += completion
+
+    def add_image(self, model):
+        with self._lock:
+            self.images[model] = self.images.get(model, 0) + 1
+
+    def cost(self):
+        total = 0.0
+        for model, (prompt, cached, completion) in self.tokens.items():
+            price_in, price_cached, price_out = model_prices(model)
+            total += ((prompt - cached) * price_in + cached * price_cached + completion * price_out) / 1_000_000
+        return total + sum(IMAGE_PRICES.get(model, 0.0) * count for model, count in self.images.items())
+
+    def summary(self):
+        # Plain data, safe to keep in st.session_state
+        stages = {}
+        with self._lock:
+            for stage, _, seconds in self.spans:
+                entry = stages.setdefault(stage, {"count": 0, "total_s": 0.0, "max_s": 0.0})
+                entry["count"] += 1
+                entry["total_s"] += seconds
+                entry["max_s"] = max(entry["max_s"], seconds)
+            tokens = {model: {"prompt": t[0], "cached": t[1], "completion": t[2]} for model, t in self.tokens.items()}
+        return {"wall_s": time.perf_counter() - self.started, "stages": stages, "tokens": tokens,
+                "images": dict(self.images), "cost_usd": self.cost()}
+
+@contextlib.contextmanager
+def run_trace():
+    trace = Trace()
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+        observe("bizonboard_run_seconds", time.perf_counter() - trace.started)
+        inc("bizonboard_runs_total")
+        inc("bizonboard_cost_usd_total", trace.cost())
+
+@contextlib.contextmanager
+def span(stage, detail=None):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        observe("bizonboard_stage_seconds", seconds, stage=stage)
+        if trace := _current.get(): trace.add_span(stage, seconds, detail)
+
+def record_usage(model, usage):
+    if usage is None: return
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", 0) or 0
+    prompt, completion = usage.prompt_tokens or 0, usage.completion_tokens or 0
+    inc("bizonboard_tokens_total", prompt - cached, model=model, kind="prompt_uncached")
+    inc("bizonboard_tokens_total", cached, model=model, kind="prompt_cached")
+    inc("bizonboard_tokens_total", completion, model=model, kind="completion")
+    if trace := _current.get(): trace.add_tokens(model, prompt, completion, cached)
+
+def record_image(model):
+    inc("bizonboard_images_total", model=model)
+    if trace := _current.get(): trace.add_image(model)
+
+
+# --- ENDPOINT ---
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def serve(port=METRICS_PORT, host=METRICS_HOST):
+    # Idempotent; when several workers share a host only the first one gets the port
+    global _server
+    with _lock:
+        if _server is not None or not port: return _server
+        try:
+            _server = ThreadingHTTPServer((host, port), _Handler)
+        except OSError:
+            _server = False
+            return None
+        _server.daemon_threads = True
+        threading.Thread(target=_server.serve_forever, name="bizonboard-metrics", daemon=True).start()
+        return _server
@@ -0,0 +1,143 @@
+import os
+
+import llm
+import metrics
+
+# --- Configuration ---
+# Bump whenever a template below changes so cached sections from the old wording are not reused
+PROMPT_VERSION = "6"
+PROMPT_TOKEN_BUDGET = int(os.environ.get("BIZONBOARD_PROMPT_TOKEN_BUDGET", "2000"))  # input tokens per section request
+
+# Fields of the wizard data that reach the prompt; the rest must not split the cache
+PROMPT_FIELDS = ("name", "industry", "business_model", "structure", "prod_name", "final_attributes")
+# The subset each section reads. A section can start (and be reused) as soon as its own fields are known,
+# which lets the wizard generate it speculatively before the last answers are in.
+SECTION_FIELDS = {
+    "taxonomy": ("name", "industry", "business_model", "structure"),
+    "products": ("name", "industry", "business_model", "prod_name", "final_attributes"),
+    "banner": ("name", "industry", "business_model"),
+    "page": ("name", "industry", "business_model", "structure"),
+    # Bulk catalog mode (bulk.py)
+    "domains": ("name", "industry", "business_model", "final_attributes"),
+    "seeds": ("name", "industry", "business_model", "final_attributes"),
+}
+FIELD_LABELS = {"name": "Client", "industry": "Industry", "business_model": "Model", "structure": "Structure",
+                "prod_name": "Product", "final_attributes": "Attributes"}
+# Pages are generated before the product name is asked for; it is filled in locally like the hero image
+PRODUCT_PLACEHOLDER = "PRODUCT_NAME_PLACEHOLDER"
+
+PAGE_LAYOUTS = {
+    "Single Page": ["Home"],
+    "Multi Page": ["Home", "About", "Services", "Contact"],
+    "Landing Page": ["Home"]
+}
+
+# How much ground one page's copy covers; the layout itself is rendered locally (templates.py)
+COPY_RULES = {
+    "Single Page": "The only page of the site: cover the whole business across its sections.",
+    "Multi Page": "One page of a multi-page site: cover only this page's topic.",
+    "Landing Page": "A conversion-focused landing page: benefits, social proof and one clear call to action."
+}
+
+
+def page_filename(page_title):
+    return "index.html" if page_title.lower() == "home" else f"{page_title.lower().replace(' ', '_')}.html"
+
+
+# --- TEMPLATES ---
+# Static text first, byte-identical for every client, so the provider can serve the prefix from its prompt
+# cache; everything client-specific goes into the CLIENT DATA block at the very end.
+SYSTEM_PROMPT = """You are a JSON factory and Lead UI/UX Architect building onboarding packages for small businesses.
+Return ONLY raw JSON in the OUTPUT JSON shape of the task. No markdown, no commentary.
+Write realistic, specific content for the client described under CLIENT DATA, and use its values verbatim
+wherever the shape refers to them (<Client>, <Model>, <Structure>, <Product>, <Attributes>)."""
+
+SECTION_TEMPLATES = {
+    "taxonomy": """TASK: Generate the Catalog Taxonomy (JSON).
+
+OUTPUT JSON (Strict):
+{
+    "business_details": { "name": "<Client>", "model": "<Model>", "structure": "<Structure>" },
+    "categories_tree": [ { "id": 1, "name": "Auto-Main", "children": [ { "id": 2, "name": "Auto-Sub" } ] } ]
+}""",
+    "products": """TASK: Generate Product Data (JSON). Auto-generate suitable Product Descriptions.
+
+OUTPUT JSON (Strict):
+{
+    "attribute_sets": [ { "name": "Custom Set", "attributes": ["<each of the Attributes>"] } ],
+    "sample_products": [
+        {
+            "id": "P001", "name": "<Product>", "description": "Auto-generated...", "price": 100,
+            "attributes": [ { "name": "Attr", "value": "Val" } ], "variants": [ { "sku": "V1", "spec": "Var1", "stock": 10 } ],
+            "pricing_rules": [ { "name": "Rule", "rule": "Desc" } ]
+        }
+    ]
+}""",
+    "banner": """TASK: Generate a Marketing Banner (inline-styled HTML div, no <html> wrapper) announcing a launch offer for <Client>.
+
+OUTPUT JSON (Strict):
+{ "marketing_banner_html": "<div style='padding: 15px; text-align: center; background: linear-gradient(90deg, #667eea 0%, #764ba2 100%); color: white; font-weight: bold;'>🚀 Launch Offer!</div>" }""",
+    "page": f"""TASK: Write the copy for the page named under CLIENT DATA. Layout, styling and navigation are rendered
+separately, so return plain text only (no HTML).
+- 3 to 5 sections; body text of 2-3 sentences; items are short bullet points (0 to 6).
+- headline under 10 words; cta_label under 4 words.
+- Wherever the featured product is named, write the literal text {PRODUCT_PLACEHOLDER}.""",
+    "domains": """TASK: Define the Catalog Domains (JSON) for a bulk product catalog. Variants are expanded from these domains
+separately, so do not list any products.
+- categories: 4 to 12 product categories.
+- domains: one entry for each of the Attributes that products vary by (size, color, material...), with 2 to 8 values;
+  price_delta is added to a product's base price (0 for the base option). Attributes that never vary get no entry.
+
+OUTPUT JSON (Strict):
+{ "categories": ["..."], "domains": [ { "name": "<one of the Attributes>", "values": [ { "value": "...", "price_delta": 0 } ] } ] }""",
+    "seeds": """TASK: Write Product Seeds (JSON) for one batch of a bulk product catalog. Variants and SKUs are computed
+separately, so list each product once.
+- Exactly Count products, all in the Category, with distinct names; each batch covers a different part of the range.
+- variant_attributes: which of the Attributes this product comes in several options of (may be empty).
+
+OUTPUT JSON (Strict):
+{ "seeds": [ { "name": "...", "description": "...", "base_price": 100, "variant_attributes": ["..."] } ] }""",
+}
+
+
+class PromptBudgetError(ValueError):
+    pass
+
+
+def section_fields(section):
+    return SECTION_FIELDS[section.split(":", 1)[0]]
+
+def _client_data(data, section, attributes):
+    values = {field: ", ".join(attributes) if field == "final_attributes" else data.get(field) for field in section_fields(section)}
+    lines = ["CLIENT DATA", " | ".join(f"{FIELD_LABELS[field]}: {value}" for field, value in values.items())]
+    if section.startswith("page:"):
+        page = section.split(":", 1)[1]
+        lines += [f"Scope: {COPY_RULES.get(data.get('structure'), COPY_RULES['Landing Page'])}",
+                  # The page name is the only per-page part, so the skeleton naming it comes last
+                  f'OUTPUT JSON (Strict): {{ "page_content": {{ "{page}": {{ "headline": "...", "subheadline": "...", "cta_label": "...", '
+                  f'"sections": [ {{ "heading": "...", "body": "...", "items": ["..."] }} ] }} }} }}']
+    elif section.startswith("seeds:"):
+        batch, count, category = section.split(":", 3)[1:]
+        lines.append(f"Category: {category} | Batch: {batch} | Count: {count}")
+    return "\n".join(lines)
+
+def build_section_prompt(data, section):
+    # The user message: the section's static template, then the client's data. Attributes are the only
+    # unbounded input, so they are trimmed from the end when the request would exceed the token budget.
+    attributes = list(data.get("final_attributes") or []) if "final_attributes" in section_fields(section) else []
+    template = SECTION_TEMPLATES[section.split(":", 1)[0]]
+    while True:
+        prompt = f"{template}\n\n{_client_data(data, section, attributes)}\n"
+        tokens = llm.count_tokens(SYSTEM_PROMPT) + llm.count_tokens(prompt)
+        if tokens <= PROMPT_TOKEN_BUDGET: return prompt
+        if not attributes:
+            raise PromptBudgetError(f"{section}: prompt needs {tokens} tokens, over the {PROMPT_TOKEN_BUDGET} token budget")
+        attributes.pop()
+        metrics.inc("bizonboard_prompt_trimmed_total", section=section.split(":", 1)[0])
+
+def section_messages(prompt):
+    return [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": prompt}]
+
+def prompt_cache_key(section):
+    # Requests sharing a static prefix are routed together, which raises the provider's cache hit rate
+    return f"bizonboard-v{PROMPT_VERSION}-{section.split(':', 1)[0]}"
@@ -0,0 +1,187 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections.abc import Mapping
+
+# --- Configuration ---
+# A file path selects the SQLite store; a redis:// URL selects a store shared by every worker (needs the redis package)
+STORE_URL = os.environ.get("BIZONBOARD_STORE", os.path.join(".cache", "sessions.sqlite3"))
+STORE_TTL = float(os.environ.get("BIZONBOARD_STORE_TTL", str(7 * 24 * 3600)))  # idle sessions are dropped after this
+STORE_MAX_RESULTS = int(os.environ.get("BIZONBOARD_STORE_MAX_RESULTS", "1000"))  # least recently viewed results go first
+
+
+def _pack(value):
+    return zlib.compress(json.dumps(value).encode("utf-8"))
+
+def _unpack(blob):
+    return json.loads(zlib.decompress(blob))
+
+def split_result(result):
+    # Page HTML is stored as one compressed blob per page; everything else is small
+    pages = dict(result.get("ui_pages", {}))
+    return {k: v for k, v in result.items() if k != "ui_pages"}, pages
+
+
+class LazyPages(Mapping):
+    # Page names are known up front; a page's HTML is only read from the store when it is shown
+    def __init__(self, store, session, names):
+        self._store = store
+        self._session = session
+        self._names = list(names)
+
+    def __getitem__(self, name):
+        html = self._store.load_page(self._session, name) if name in self._names else None
+        if html is None: raise KeyError(name)
+        return html
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
+
+# --- BACKENDS ---
+# Both backends offer load_state/save_state (wizard answers, step, chat), save_result/load_result
+# (the generated package, pages loaded lazily), load_page and delete.
+class SqliteStore:
+    def __init__(self, path, ttl=STORE_TTL, max_results=STORE_MAX_RESULTS):
+        self.path = path
+        self.ttl = ttl
+        self.max_results = max_results
+        self._lock = threading.Lock()
+        self._db = None
+
+    def _conn(self):
+        if self._db is None:
+            if os.path.dirname(self.path): os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")  # several workers on one host share the file
+            self._db.execute("CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, state BLOB, result BLOB, accessed REAL)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS pages (session TEXT, name TEXT, html BLOB, PRIMARY KEY (session, name))")
+            self._db.execute("CREATE INDEX IF NOT EXISTS sessions_accessed ON sessions (accessed)")
+        return self._db
+
+    def load_state(self, session):
+        with self._lock:
+            db = self._conn()
+            row = db.execute("SELECT state, accessed FROM sessions WHERE id = ?", (session,)).fetchone()
+            if not row or not row[0] or row[1] < time.time() - self.ttl: return None
+            db.execute("UPDATE sessions SET accessed = ? WHERE id = ?", (time.time(), session))
+            db.commit()
+        return _unpack(row[0])
+
+    def save_state(self, session, state):
+        blob = _pack(state)
+        with self._lock:
+            db = self._conn()
+            db.execute("INSERT INTO sessions (id, state, accessed) VALUES (?, ?, ?) ON CONFLICT (id) DO UPDATE SET state = excluded.state, "
+                       "accessed = excluded.accessed", (session, blob, time.time()))
+            db.commit()
+
+    def save_result(self, session, result):
+        rest, pages = split_result(result)
+        now = time.time()
+        with self._lock:
+            db = self._conn()
+            db.execute("DELETE FROM pages WHERE session = ?", (session,))
+            db.executemany("INSERT INTO pages VALUES (?, ?, ?)", [(session, name, zlib.compress(html.encode("utf-8"))) for name, html in pages.items()])
+            db.execute("INSERT INTO sessions (id, result, accessed) VALUES (?, ?, ?) ON CONFLICT (id) DO UPDATE SET result = excluded.result, "
+                       "accessed = excluded.accessed", (session, _pack({"result": rest, "pages": list(pages)}), now))
+            self._evict(db, now)
+            db.commit()
+
+    def load_result(self, session):
+        with self._lock:
+            row = self._conn().execute("SELECT result FROM sessions WHERE id = ?", (session,)).fetchone()
+        if not row or not row[0]: return None
+        stored = _unpack(row[0])
+        return {**stored["result"], "ui_pages": LazyPages(self, session, stored["pages"])}
+
+    def load_page(self, session, name):
+        with self._lock:
+            row = self._conn().execute("SELECT html FROM pages WHERE session = ? AND name = ?", (session, name)).fetchone()
+        return zlib.decompress(row[0]).decode("utf-8") if row else None
+
+    def delete(self, session):
+        with self._lock:
+            db = self._conn()
+            db.execute("DELETE FROM pages WHERE session = ?", (session,))
+            db.execute("DELETE FROM sessions WHERE id = ?", (session,))
+            db.commit()
+
+    def _evict(self, db, now):
+        db.execute("DELETE FROM pages WHERE session IN (SELECT id FROM sessions WHERE accessed < ?)", (now - self.ttl,))
+        db.execute("DELETE FROM sessions WHERE accessed < ?", (now - self.ttl,))
+        # Past the limit, the least recently viewed results are dropped; their wizard state stays
+        stale = [row[0] for row in db.execute("SELECT id FROM sessions WHERE result IS NOT NULL ORDER BY accessed DESC LIMIT -1 OFFSET ?",
+                                              (self.max_results,))]
+        for session in stale:
+            db.execute("DELETE FROM pages WHERE session = ?", (session,))
+            db.execute("UPDATE sessions SET result = NULL WHERE id = ?", (session,))
+
+
+class RedisStore:
+    # Shared by every worker behind the load balancer; keys expire on their own after the TTL
+    def __init__(self, url, ttl=STORE_TTL, max_results=STORE_MAX_RESULTS):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("BIZONBOARD_STORE points at Redis but the redis package is not installed (pip install redis).")
+        self.db = redis.Redis.from_url(url)
+        self.ttl = int(ttl)
+        self.max_results = max_results
+
+    def _key(self, kind, session):
+        return f"bizonboard:{kind}:{session}"
+
+    def load_state(self, session):
+        blob = self.db.getex(self._key("state", session), ex=self.ttl)
+        return _unpack(blob) if blob else None
+
+    def save_state(self, session, state):
+        self.db.set(self._key("state", session), _pack(state), ex=self.ttl)
+
+    def save_result(self, session, result):
+        rest, pages = split_result(result)
+        pipe = self.db.pipeline()
+        pipe.delete(self._key("pages", session))
+        if pages:
+            pipe.hset(self._key("pages", session), mapping={name: zlib.compress(html.encode("utf-8")) for name, html in pages.items()})
+        pipe.expire(self._key("pages", session), self.ttl)
+        pipe.set(self._key("result", session), _pack({"result": rest, "pages": list(pages)}), ex=self.ttl)
+        pipe.zadd("bizonboard:results", {session: time.time()})
+        pipe.execute()
+        # Past the limit, the least recently viewed results are dropped; their wizard state stays
+        overflow = self.db.zcard("bizonboard:results") - self.max_results
+        if overflow > 0:
+            for stale, _ in self.db.zpopmin("bizonboard:results", overflow):
+                stale = stale.decode("utf-8")
+                self.db.delete(self._key("result", stale), self._key("pages", stale))
+
+    def load_result(self, session):
+        blob = self.db.getex(self._key("result", session), ex=self.ttl)
+        if not blob: return None
+        self.db.zadd("bizonboard:results", {session: time.time()})
+        stored = _unpack(blob)
+        return {**stored["result"], "ui_pages": LazyPages(self, session, stored["pages"])}
+
+    def load_page(self, session, name):
+        blob = self.db.hget(self._key("pages", session), name)
+        return zlib.decompress(blob).decode("utf-8") if blob else None
+
+    def delete(self, session):
+        self.db.delete(self._key("state", session), self._key("result", session), self._key("pages", session))
+        self.db.zrem("bizonboard:results", session)
+
+
+def open_store(url=STORE_URL):
+    if url.startswith(("redis://", "rediss://", "unix://")): return RedisStore(url)
+    return SqliteStore(url)
+
+
+# Shared by every session in the process
+session_store = open_store()
@@ -0,0 +1,138 @@
+import datetime
+from html import escape
+
+from prompts import PAGE_LAYOUTS, page_filename
+
+# Pages are rendered locally from the model's structured copy: the navbar, palette and layout CSS are
+# written once here instead of being generated (and paid for) on every page.
+
+# --- THEME ---
+INDUSTRY_PALETTES = {
+    "Architecture & Design": "--primary: #1F2933; --accent: #C9A227; --bg: #F7F5F0; --text: #1F2933; --muted: #7B8794",
+    "Hospitality & Tourism": "--primary: #0B3C5D; --accent: #F2A541; --bg: #FDFBF7; --text: #1D2731; --muted: #6C7A89",
+    "Real Estate & Property Development": "--primary: #14213D; --accent: #2A9D8F; --bg: #F8F9FA; --text: #14213D; --muted: #6C757D",
+    "Healthcare & Medical Services": "--primary: #0077B6; --accent: #00B4D8; --bg: #F5FBFF; --text: #023047; --muted: #5C7080",
+    "Retail & Consumer Goods": "--primary: #2B2D42; --accent: #EF476F; --bg: #FFFFFF; --text: #2B2D42; --muted: #8D99AE"
+}
+DEFAULT_PALETTE = "--primary: #1E293B; --accent: #00C853; --bg: #FFFFFF; --text: #0F172A; --muted: #64748B"
+
+INDUSTRY_ICONS = {
+    "Architecture & Design": "fa-compass-drafting",
+    "Hospitality & Tourism": "fa-umbrella-beach",
+    "Real Estate & Property Development": "fa-building",
+    "Healthcare & Medical Services": "fa-heart-pulse",
+    "Retail & Consumer Goods": "fa-bag-shopping"
+}
+DEFAULT_ICON = "fa-store"
+
+# Pages that show the featured products from the catalog section
+PRODUCT_PAGES = {"Home", "Services"}
+
+HEAD = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{title}</title>
+<link rel="stylesheet" href="https://fonts.googleapis.com/css2?family=Poppins:wght@400;600;700&display=swap">
+<link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.5.1/css/all.min.css">
+<style>
+:root {{ {palette} }}
+{css}
+</style>
+</head>
+"""
+
+BASE_CSS = """* { box-sizing: border-box; margin: 0; padding: 0; }
+body { font-family: 'Poppins', sans-serif; background: var(--bg); color: var(--text); line-height: 1.6; }
+a { color: inherit; text-decoration: none; }
+nav { display: flex; align-items: center; justify-content: space-between; padding: 18px 6%; background: var(--primary); color: #fff; }
+nav.sticky { position: sticky; top: 0; z-index: 10; box-shadow: 0 2px 12px rgba(0,0,0,.15); }
+.logo { display: flex; align-items: center; gap: 10px; font-weight: 700; font-size: 1.3rem; }
+.logo i { color: var(--accent); font-size: 1.5rem; }
+.links { display: flex; gap: 24px; list-style: none; }
+.links a { opacity: .85; transition: opacity .2s; }
+.links a:hover, .links a.active { opacity: 1; border-bottom: 2px solid var(--accent); }
+.hero { display: grid; grid-template-columns: 1.1fr 1fr; gap: 40px; align-items: center; padding: 70px 6%; }
+.hero h1 { font-size: 2.6rem; line-height: 1.2; color: var(--primary); }
+.hero p { margin: 18px 0 28px; color: var(--muted); font-size: 1.1rem; }
+.hero img { width: 100%; border-radius: 16px; box-shadow: 0 20px 40px rgba(0,0,0,.18); }
+.btn { display: inline-block; padding: 14px 30px; border-radius: 30px; background: var(--accent); color: #fff; font-weight: 600; transition: transform .2s, box-shadow .2s; }
+.btn:hover { transform: translateY(-2px); box-shadow: 0 8px 20px rgba(0,0,0,.2); }
+section { padding: 60px 6%; }
+section h2 { font-size: 1.8rem; color: var(--primary); margin-bottom: 14px; }
+section ul { margin-top: 14px; padding-left: 20px; }
+.grid { display: grid; grid-template-columns: repeat(auto-fit, minmax(240px, 1fr)); gap: 24px; margin-top: 24px; }
+.card { background: #fff; border-radius: 14px; padding: 26px; box-shadow: 0 6px 18px rgba(0,0,0,.08); transition: transform .2s; }
+.card:hover { transform: translateY(-4px); }
+.price { color: var(--accent); font-weight: 700; font-size: 1.2rem; }
+footer { padding: 30px 6%; background: var(--primary); color: #fff; text-align: center; opacity: .95; }
+@media (max-width: 800px) { .hero { grid-template-columns: 1fr; } .links { display: none; } }"""
+
+LANDING_CSS = """.hero { min-height: 80vh; }
+.cta-band { text-align: center; background: var(--primary); color: #fff; }
+.cta-band h2 { color: #fff; }"""
+
+
+def palette_for(industry):
+    return INDUSTRY_PALETTES.get(industry, DEFAULT_PALETTE)
+
+
+# --- BLOCKS ---
+def _text(value):
+    return escape("" if value is None else str(value))
+
+def _nav(data, page, structure, content):
+    icon = INDUSTRY_ICONS.get(data.get("industry"), DEFAULT_ICON)
+    logo = f'<a class="logo" href="{page_filename("Home")}"><i class="fa-solid {icon}"></i>{_text(data.get("name"))}</a>'
+    pages = PAGE_LAYOUTS.get(structure, ["Home"])
+    if structure == "Multi Page":
+        links = "".join(f'<li><a href="{page_filename(p)}" class="{"active" if p == page else ""}">{_text(p)}</a></li>' for p in pages)
+    elif structure == "Landing Page":
+        return f'<nav>{logo}<a class="btn" href="#cta">{_text(content.get("cta_label") or "Get Started")}</a></nav>'
+    else:
+        links = "".join(f'<li><a href="#section-{i}">{_text(s.get("heading"))}</a></li>' for i, s in enumerate(content.get("sections", [])[:5], 1))
+    return f'<nav class="sticky">{logo}<ul class="links">{links}</ul></nav>'
+
+def _hero(content):
+    return (f'<header class="hero"><div><h1>{_text(content.get("headline"))}</h1><p>{_text(content.get("subheadline"))}</p>'
+            f'<a class="btn" href="#cta">{_text(content.get("cta_label") or "Get Started")}</a></div>'
+            f'<img src="HERO_IMAGE_PLACEHOLDER" alt="{_text(content.get("headline"))}"></header>')
+
+def _sections(content, cards):
+    blocks = []
+    for i, s in enumerate(content.get("sections", []), 1):
+        items = "".join(f"<li>{_text(item)}</li>" for item in s.get("items") or [])
+        body = f'<h2>{_text(s.get("heading"))}</h2><p>{_text(s.get("body"))}</p>' + (f"<ul>{items}</ul>" if items else "")
+        blocks.append(f'<div class="card">{body}</div>' if cards else f'<section id="section-{i}">{body}</section>')
+    return f'<section><div class="grid">{"".join(blocks)}</div></section>' if cards and blocks else "".join(blocks)
+
+def _products(products):
+    if not products: return ""
+    cards = "".join(f'<div class="card"><h3>{_text(p.get("name"))}</h3><p>{_text(p.get("description"))}</p>'
+                    f'<p class="price">{_text(p.get("price"))}</p></div>' for p in products)
+    return f'<section id="products"><h2>Featured</h2><div class="grid">{cards}</div></section>'
+
+def _cta(content, landing):
+    label = _text(content.get("cta_label") or "Get Started")
+    return f'<section id="cta" class="{"cta-band" if landing else ""}"><h2>{label}</h2><p><a class="btn" href="#">{label}</a></p></section>'
+
+
+# --- PAGES ---
+def render_page(data, page, content, products=None, palette=None):
+    structure = data.get("structure", "Single Page")
+    landing = structure == "Landing Page"
+    head = HEAD.format(title=escape(f"{data.get('name') or ''} | {page}"), palette=palette or palette_for(data.get("industry")),
+                       css=BASE_CSS + ("\n" + LANDING_CSS if landing else ""))
+    body = [_nav(data, page, structure, content), _hero(content), _sections(content, cards=landing)]
+    if page in PRODUCT_PAGES or structure != "Multi Page": body.append(_products(products))
+    body.append(_cta(content, landing))
+    body.append(f"<footer>&copy; {datetime.date.today().year} {_text(data.get('name'))}. All rights reserved.</footer>")
+    return head + "<body>\n" + "\n".join(body) + "\n</body>\n</html>"
+
+def render_site(package, data, palette=None):
+    # All pages of a package; cheap enough to re-run for a new palette or layout without another model call
+    contents = package.get("page_content", {})
+    layout = PAGE_LAYOUTS.get(data.get("structure"), [])
+    order = sorted(contents, key=lambda p: layout.index(p) if p in layout else len(layout))
+    return {page: render_page(data, page, contents[page], package.get("sample_products"), palette) for page in order}
@@ -0,0 +1,38 @@
+from bulk import domain_codes, expand_variants, plan_batches, prepare_domains
+
+
+def test_batches_spread_evenly_and_respect_the_batch_size():
+    batches = plan_batches(["A", "B", "C"], 10, batch_size=3)
+    assert batches == [("A", 1, 3), ("A", 2, 1), ("B", 1, 3), ("C", 1, 3)]
+    assert sum(count for _, _, count in plan_batches(["A", "B"], 1001, batch_size=25)) == 1001
+    assert plan_batches(["A", "B", "C"], 2) == [("A", 1, 1), ("B", 1, 1)]
+
+
+def test_domain_codes_are_unique():
+    assert domain_codes(["Navy Blue", "Navy", "navy-x", "!!", "XL"]) == ["NAV", "NAV2", "NAV3", "X", "XL"]
+
+
+def test_prepare_domains_keeps_the_first_occurrence():
+    domains = prepare_domains([
+        {"name": "Size", "values": [{"value": "S", "price_delta": 0}, {"value": "M", "price_delta": 2}, {"value": "S", "price_delta": 9}]},
+        {"name": "Size", "values": [{"value": "XL"}]},  # repeated domain
+        {"name": "Empty", "values": [{"value": ""}]},
+        {"name": "Color", "values": [{"value": "Red", "price_delta": None}]},
+    ])
+    assert domains == {"Size": [("S", "S", 0), ("M", "M", 2)], "Color": [("Red", "RED", 0)]}
+
+
+def test_variants_are_the_cartesian_product():
+    domains = prepare_domains([
+        {"name": "Size", "values": [{"value": "S", "price_delta": 0}, {"value": "L", "price_delta": 5}]},
+        {"name": "Color", "values": [{"value": "Red", "price_delta": 0}, {"value": "Blue", "price_delta": 1.5}]},
+    ])
+    product = {"id": "P00001", "price": 10, "variant_attributes": ["Size", "Color", "Size", "Unknown"]}
+    rows = list(expand_variants(product, domains))
+    assert [r["sku"] for r in rows] == ["P00001-S-RED", "P00001-S-BLU", "P00001-L-RED", "P00001-L-BLU"]
+    assert [r["price"] for r in rows] == [10, 11.5, 15, 16.5]
+    assert rows[3] == {"sku": "P00001-L-BLU", "product_id": "P00001", "Size": "L", "Color": "Blue", "price": 16.5, "stock": 10}
+
+
+def test_a_product_without_variant_attributes_is_one_row():
+    assert [r["sku"] for r in expand_variants({"id": "P2", "price": 3, "variant_attributes": []}, {})] == ["P2"]
@@ -0,0 +1,39 @@
+from bundle import _img_tags, minify_css, minify_html
+
+
+def test_css_is_squeezed_outside_strings():
+    css = """
+    /* header */
+    .hero > h1 , .hero h2 {
+        color : red;
+        margin: 0 auto ;
+    }
+    a :hover { color: blue; }
+    """
+    assert minify_css(css) == ".hero>h1,.hero h2{color : red;margin:0 auto}a :hover{color:blue}"
+
+
+def test_css_strings_are_kept_as_written():
+    assert minify_css('p::before { content: " , "; }') == 'p::before{content:" , "}'
+    assert minify_css("a { background: url('a b.png') ; }") == "a{background:url('a b.png')}"
+    assert minify_css('p { content: "a\\" ; /* not a comment */"; }') == 'p{content:"a\\" ; /* not a comment */"}'
+    assert minify_css("p { content: '}' ; color: red; }") == "p{content:'}';color:red}"
+
+
+def test_html_whitespace_collapses_to_one_space():
+    assert minify_html("<p>hello <b>world</b>\n<i>x</i></p>") == "<p>hello <b>world</b> <i>x</i></p>"
+    assert minify_html("<div>\n\n   <span>a</span>\n</div>  ") == "<div> <span>a</span> </div>"
+    assert minify_html("<p>a</p><!-- note --><!--[if IE]>x<![endif]-->") == "<p>a</p><!--[if IE]>x<![endif]-->"
+
+
+def test_html_with_preformatted_text_is_left_alone():
+    page = "<pre>a\n   b</pre>\n\n<p>x</p>"
+    assert minify_html(page) == page
+
+
+def test_first_image_is_eager_and_the_rest_lazy():
+    page = '<img src="https://x/h.png?a=1&amp;b=2"><img src="b.png" /><img src="c.png" loading="eager">'
+    out = _img_tags(page, "https://x/h.png?a=1&b=2", 'src="assets/hero.webp"')
+    assert out == ('<img src="assets/hero.webp" fetchpriority="high" decoding="async">'
+                   '<img src="b.png" loading="lazy" decoding="async"/>'
+                   '<img src="c.png" loading="eager">')
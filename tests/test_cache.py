@@ -0,0 +1,91 @@
+import os
+import sqlite3
+import time
+
+from cache import ResultCache, make_key
+
+
+def test_keys_ignore_whitespace_and_dict_order():
+    assert make_key("s", {"a": "x  y", "b": 1}) == make_key("s", {"b": 1, "a": " x y "})
+    assert make_key("s", ["a", "b"]) != make_key("s", ["b", "a"])
+
+
+def test_entries_expire_after_their_ttl(tmp_path):
+    cache = ResultCache(str(tmp_path / "c.sqlite3"), ttl=60)
+    cache.put("short", {"v": 1}, ttl=0.05)
+    cache.put("long", {"v": 2})
+    assert cache.get("short") == {"v": 1}
+    time.sleep(0.1)
+    assert cache.get("short") is None
+    assert cache.get("long") == {"v": 2}
+    assert cache.stats()["entries"] == 1  # the expired entry was dropped on read
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    cache = ResultCache(str(tmp_path / "c.sqlite3"), max_entries=2)
+    cache.put("a", 1)
+    time.sleep(0.01)
+    cache.put("b", 2)
+    time.sleep(0.01)
+    assert cache.get("a") == 1  # a is now the most recently used
+    time.sleep(0.01)
+    cache.put("c", 3)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+
+
+def test_size_limit_evicts_until_it_holds(tmp_path):
+    cache = ResultCache(str(tmp_path / "c.sqlite3"))
+    cache.put("k0", os.urandom(32).hex())
+    size = cache.stats()["bytes"]
+    cache.max_bytes = size * 3 + size // 2  # room for three entries, whatever a few bytes of compression do
+    for i in range(1, 10):
+        time.sleep(0.005)
+        cache.put(f"k{i}", os.urandom(32).hex())
+    stats = cache.stats()
+    assert stats["entries"] == 3 and stats["bytes"] <= cache.max_bytes
+    assert [i for i in range(10) if cache.get(f"k{i}") is not None] == [7, 8, 9]
+
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    cache = ResultCache(str(tmp_path / "c.sqlite3"), enabled=False)
+    cache.put("a", 1)
+    assert cache.get("a") is None
+
+
+def test_locked_database_is_a_miss(tmp_path):
+    path = str(tmp_path / "c.sqlite3")
+    cache = ResultCache(path)
+    cache.put("a", 1)
+    cache._conn().execute("PRAGMA busy_timeout = 50")
+    other = sqlite3.connect(path)
+    other.execute("BEGIN EXCLUSIVE")
+    try:
+        cache.put("b", 2)  # swallowed
+        assert cache.get("a") is None
+    finally:
+        other.rollback()
+    assert cache.get("a") == 1
+
+
+def test_stats_and_clear_survive_a_locked_database(tmp_path):
+    path = str(tmp_path / "c.sqlite3")
+    cache = ResultCache(path)
+    cache.put("a", 1)
+    cache._conn().execute("PRAGMA busy_timeout = 50")
+    other = sqlite3.connect(path)
+    other.execute("BEGIN EXCLUSIVE")
+    try:
+        assert cache.stats()["entries"] == 1  # WAL readers are not blocked by a writer
+        cache.clear()  # swallowed
+    finally:
+        other.rollback()
+    assert cache.stats()["entries"] == 1
+    cache.clear()
+    assert cache.stats()["entries"] == 0
+
+
+def test_unreadable_cache_file_has_no_stats(tmp_path):
+    cache = ResultCache(str(tmp_path))  # a directory, not a database
+    assert cache.stats() is None
+    cache.clear()
+    assert cache.get("a") is None
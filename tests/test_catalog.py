@@ -0,0 +1,72 @@
+import json
+import marshal
+
+import pytest
+
+from catalog import Catalog, catalog, load_catalog
+
+DOC = {
+    "fallback_model": "General Service",
+    "industries": {"Retail": {"models": ["Apparel", "Furniture"]}, "Services": {"models": ["General Service"]}},
+    "models": {
+        "Apparel": {"defaults": ["Size", "Color"], "pool": ["Color Family", "Material", "Sleeve Length", "Fit"]},
+        "Furniture": {"defaults": ["Material", "Color"], "pool": ["Room", "Assembly Required"]},
+        "General Service": {"defaults": ["Duration"], "pool": ["Service Color Code"]},
+    },
+}
+
+
+@pytest.fixture
+def small():
+    return Catalog(DOC)
+
+
+def test_exact_then_prefix_then_word_prefix(small):
+    # "Color" is exact; "Color Family" starts with the query; "Service Color Code" only has a word starting with it
+    assert small.search("color") == ["Color", "Color Family", "Service Color Code"]
+    assert small.search("COL  ") == ["Color", "Color Family", "Service Color Code"]  # case and spacing do not matter
+
+
+def test_ties_go_to_popularity_then_boost(small):
+    # Material is used by two models, Room by one
+    assert small.search("ma")[:1] == ["Material"]
+    assert small.search("s")[:3] == ["Size", "Service Color Code", "Sleeve Length"]  # equally popular: by name
+    assert small.search("s", boost=["Sleeve Length"])[:2] == ["Sleeve Length", "Size"]
+
+
+def test_multi_word_queries_match_word_prefixes(small):
+    assert small.search("len sle") == ["Sleeve Length"]
+    assert small.search("assembly req") == ["Assembly Required"]
+
+
+def test_typos_fall_back_to_trigrams(small):
+    assert small.search("colr")[:1] == ["Color"]
+    assert small.search("matrial") == ["Material"]
+    assert small.search("xyzzy") == []
+    assert small.search("") == []
+
+
+def test_limit(small):
+    assert len(small.search("c", limit=2)) == 2
+
+
+def test_suggestions_start_with_the_defaults(small):
+    suggestions = small.suggestions("Apparel", "Retail", ["Size", "Color"])
+    assert suggestions[:2] == ["Size", "Color"] and "Room" in suggestions  # Furniture is in the same industry
+    assert len(suggestions) == len(set(suggestions))
+
+
+def test_bundled_catalog_finds_common_attributes():
+    assert catalog.search("size")[:1] == ["Size"]
+    assert catalog.search("warrenty")[:1] == ["Warranty Period"]
+
+
+def test_index_round_trip_and_rebuild(tmp_path):
+    data, index = tmp_path / "catalog.json", tmp_path / "catalog.index"
+    data.write_text(json.dumps(DOC))
+    built = load_catalog(str(data), str(index))
+    loaded = load_catalog(str(data), str(index))
+    assert vars(loaded) == vars(built) and loaded.search("colr") == built.search("colr")
+    index.write_bytes(b"not an index")
+    assert load_catalog(str(data), str(index)).search("color")[:1] == ["Color"]
+    assert marshal.loads(index.read_bytes())[1]["names"] == built.names  # rewritten as plain data
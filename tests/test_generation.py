@@ -0,0 +1,82 @@
+import re
+
+from generation import (fill_placeholders, finalize_package, missing_keys, parse_section, plan_sections, section_schema, split_sections,
+                        stale_sections)
+from prompts import PRODUCT_PLACEHOLDER
+
+DATA = {"name": "Slice", "industry": "Retail & Consumer Goods", "business_model": "Restaurant", "structure": "Single Page",
+        "prod_name": '12" Pizza <b>x</b> & more'}
+PACKAGE = {"page_content": {"Home": {"headline": f"Try our {PRODUCT_PLACEHOLDER}", "subheadline": f"{PRODUCT_PLACEHOLDER} today",
+                                     "cta_label": "Order", "sections": [{"heading": "Why", "body": f"{PRODUCT_PLACEHOLDER}.", "items": []}]}}}
+
+
+def test_product_name_is_escaped_in_text_and_attributes():
+    page = finalize_package(PACKAGE, "https://img/hero.png", DATA)["ui_pages"]["Home"]
+    alt = re.search(r'<img src="https://img/hero.png" alt="([^"]*)">', page)
+    assert alt and alt.group(1) == "Try our 12&quot; Pizza &lt;b&gt;x&lt;/b&gt; &amp; more"
+    assert "<b>x</b>" not in page
+
+
+def test_missing_product_name_leaves_no_placeholder():
+    assert fill_placeholders(f"<p>{PRODUCT_PLACEHOLDER}</p>", "u", None) == "<p></p>"
+
+
+def test_schema_names_fit_the_api_pattern():
+    for section in ["taxonomy", "page:Über uns", "seeds:1:25:Pâtisserie & Crème", "page:" + "x" * 80]:
+        name = section_schema(section)["json_schema"]["name"]
+        assert re.fullmatch(r"[a-zA-Z0-9_-]{1,64}", name), name
+    assert section_schema("seeds:1:25:Pâtisserie & Crème")["json_schema"]["name"] == "bizonboard_seeds"
+
+
+EDIT_DATA = {"name": "Trail Co", "industry": "Hospitality & Tourism", "business_model": "Travel Package", "structure": "Multi Page",
+             "segment": "B2C (Individual Consumers)", "prod_name": "Trek", "final_attributes": ["Duration"]}
+
+
+def test_product_edits_only_invalidate_the_products():
+    assert stale_sections(EDIT_DATA, {**EDIT_DATA, "prod_name": "Glacier Trek"}) == ["products"]
+    assert stale_sections(EDIT_DATA, {**EDIT_DATA, "final_attributes": ["Duration", "Level"]}) == ["products"]
+    assert stale_sections(EDIT_DATA, {**EDIT_DATA, "segment": "B2B (Businesses / Companies)"}) == []
+
+
+def test_structure_edits_invalidate_taxonomy_and_the_new_pages():
+    assert stale_sections(EDIT_DATA, {**EDIT_DATA, "structure": "Single Page"}) == ["taxonomy", "page:Home"]
+
+
+def test_identity_edits_invalidate_everything_and_the_hero():
+    edited = {**EDIT_DATA, "name": "Summit Co"}
+    assert stale_sections(EDIT_DATA, edited) == plan_sections(edited) + ["hero image"]
+
+
+def test_split_sections_returns_reusable_parts():
+    result = {"business_details": {"name": "x"}, "categories_tree": [], "attribute_sets": [], "sample_products": [],
+              "page_content": {"Home": {"headline": "h"}, "About": {"headline": "a"}}, "generated_image_url": "https://img/h.png"}
+    parts = split_sections(result, ["taxonomy", "products", "banner", "page:Home", "page:Contact", "hero image"])
+    assert parts == {"taxonomy": {"business_details": {"name": "x"}, "categories_tree": []},
+                     "products": {"attribute_sets": [], "sample_products": []},
+                     "page:Home": {"page_content": {"Home": {"headline": "h"}}},
+                     "hero image": "https://img/h.png"}  # no banner or Contact page in the package, so nothing to reuse
+
+
+def test_parse_section_reads_fenced_json_and_maps_product_attributes():
+    content = '```json\n{"sample_products": [{"name": "A", "attributes": [{"name": "Size", "value": "M"}, "junk"]}], "attribute_sets": []}\n```'
+    assert parse_section(content) == {"sample_products": [{"name": "A", "attributes": {"Size": "M"}}], "attribute_sets": []}
+
+
+def test_parse_section_keeps_the_complete_keys_of_a_cut_off_reply():
+    content = '{"business_details": {"name": "x"}, "categories_tree": [{"id": 1, "name": "Ma'
+    result = parse_section(content)
+    assert result == {"business_details": {"name": "x"}}
+    assert missing_keys(result, "taxonomy") == ["categories_tree"]
+
+
+def test_parse_section_rejects_anything_but_an_object():
+    assert parse_section("[1, 2]") == {}
+    assert parse_section("") == {}
+    assert parse_section(None) == {}
+
+
+def test_missing_keys_for_pages():
+    assert missing_keys({"page_content": {"Home": {"headline": "h"}}}, "page:Home") == []
+    assert missing_keys({"page_content": {"Home": "not an object"}}, "page:Home") == ["page_content"]
+    assert missing_keys({"page_content": {"About": {}}}, "page:Home") == ["page_content"]
+    assert missing_keys({"marketing_banner_html": ""}, "banner") == []
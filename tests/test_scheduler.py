@@ -0,0 +1,108 @@
+import asyncio
+import importlib
+import sys
+import time
+import types
+
+import openai
+import pytest
+
+import llm
+
+# The HTTP library the installed SDK is built on (httpx or httpx2)
+http = importlib.import_module(type(openai.DEFAULT_CONNECTION_LIMITS).__module__.split(".")[0])
+
+
+def status_error(cls, status, headers=None, code=None):
+    request = http.Request("POST", "https://api.openai.com/v1/chat/completions")
+    response = http.Response(status, headers=headers or {}, request=request)
+    return cls("mock", response=response, body={"code": code} if code else None)
+
+
+def test_retry_after_headers_are_honoured():
+    assert 0.25 <= llm.retry_delay(status_error(openai.RateLimitError, 429, {"retry-after-ms": "250"}), 0) <= 0.5
+    assert 3 <= llm.retry_delay(status_error(openai.RateLimitError, 429, {"retry-after": "3"}), 0) <= 3.25
+    # A value that is not a number falls back to the jittered backoff
+    assert 0 <= llm.retry_delay(status_error(openai.RateLimitError, 429, {"retry-after": "soon"}), 2) <= min(llm.BACKOFF_MAX, llm.BACKOFF_BASE * 4)
+
+
+def test_retryable_errors():
+    assert llm.is_retryable(status_error(openai.RateLimitError, 429))
+    assert not llm.is_retryable(status_error(openai.RateLimitError, 429, code="insufficient_quota"))  # waiting will not help
+    assert llm.is_retryable(status_error(openai.InternalServerError, 503))
+    assert not llm.is_retryable(status_error(openai.BadRequestError, 400))
+    assert not llm.is_retryable(ValueError("not an API error"))
+
+
+def test_scheduler_retries_after_the_server_delay():
+    async def scenario():
+        scheduler = llm.Scheduler("test", rpm=60000, concurrency=2)
+        attempts = []
+
+        async def request():
+            attempts.append(asyncio.get_running_loop().time())
+            if len(attempts) == 1: raise status_error(openai.RateLimitError, 429, {"retry-after-ms": "50"})
+            return "ok"
+        return await scheduler.call(request, "s1"), attempts, scheduler.retries
+    result, attempts, retries = asyncio.run(scenario())
+    assert result == "ok" and retries == 1
+    assert attempts[1] - attempts[0] >= 0.05
+
+
+def test_scheduler_does_not_retry_a_bad_request():
+    async def scenario():
+        scheduler = llm.Scheduler("test", rpm=60000, concurrency=1)
+
+        async def request():
+            raise status_error(openai.BadRequestError, 400)
+        with pytest.raises(openai.BadRequestError):
+            await scheduler.call(request, "s1")
+        return scheduler.retries
+    assert asyncio.run(scenario()) == 0
+
+
+def test_scheduler_admits_in_arrival_order():
+    async def scenario():
+        scheduler = llm.Scheduler("test", rpm=60000, concurrency=1)
+        release, order = asyncio.Event(), []
+
+        async def request(name):
+            order.append(name)
+            if name == "first": await release.wait()
+        tasks = []
+        for name in ["first", "a", "b", "c", "d"]:
+            tasks.append(asyncio.ensure_future(scheduler.call(lambda name=name: request(name), name)))
+            await asyncio.sleep(0)  # each arrives after the previous one is queued
+        await asyncio.sleep(0.01)
+        positions = [scheduler.position(name) for name in ["first", "a", "b", "c", "d"]]
+        release.set()
+        await asyncio.gather(*tasks)
+        return order, positions
+    order, positions = asyncio.run(scenario())
+    assert order == ["first", "a", "b", "c", "d"]
+    assert positions == [0, 1, 2, 3, 4]
+
+
+def test_tokenizer_loads_off_the_event_loop(monkeypatch):
+    class SlowTiktoken:
+        @staticmethod
+        def get_encoding(name):
+            time.sleep(0.2)  # import + download
+            return types.SimpleNamespace(encode=lambda text: text.split())
+    monkeypatch.setitem(sys.modules, "tiktoken", SlowTiktoken)
+    monkeypatch.setattr(llm, "_encoding", None)
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+        task = asyncio.ensure_future(ticker())
+        await asyncio.gather(llm.load_tokenizer(), llm.load_tokenizer())
+        task.cancel()
+        return ticks
+    assert asyncio.run(scenario()) >= 10  # the loop kept running while the encoding loaded
+    assert llm.count_tokens("a b c") == 3
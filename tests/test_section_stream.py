@@ -0,0 +1,52 @@
+import json
+
+from generation import NESTED_KEYS, SectionStream
+
+DOC = {
+    "business_details": {"name": "Café \"Zero\"", "tagline": "braces { } [ ] and \\ backslashes, é"},
+    "categories_tree": [{"id": 1, "name": "Main", "children": [{"id": 2, "name": "Sub, \"quoted\""}]}],
+    "page_content": {"Home": {"headline": "Hi: {there}", "sections": []}, "About": {"headline": "\\\"", "sections": [{"items": ["a"]}]}},
+    "count": 42,
+    "ratio": -1.5e3,
+    "flags": [True, False, None],
+    "marketing_banner_html": "<div style='x'>🚀</div>",
+}
+
+
+def collect(chunks):
+    sections = {}
+
+    def on_section(key, value):
+        if key in NESTED_KEYS: sections.setdefault(key, {}).update(value)
+        else: sections[key] = value
+    stream = SectionStream(on_section)
+    for chunk in chunks:
+        stream.feed(chunk)
+    return sections
+
+
+def test_every_split_point_matches_json_loads():
+    raw = json.dumps(DOC, ensure_ascii=False)
+    for i in range(len(raw) + 1):
+        assert collect([raw[:i], raw[i:]]) == DOC
+
+
+def test_one_character_at_a_time_with_ascii_escapes():
+    raw = json.dumps(DOC, indent=2)  # \uXXXX escapes and newlines between tokens
+    assert collect(raw) == DOC
+
+
+def test_preamble_and_fences_are_skipped():
+    assert collect(["Sure!\n```json\n", json.dumps(DOC), "\n```"]) == DOC
+
+
+def test_truncated_stream_hands_on_only_complete_sections():
+    raw = json.dumps(DOC)
+    cut = raw.index('"About"') + 12
+    sections = collect([raw[:cut]])
+    assert sections == {k: DOC[k] for k in ("business_details", "categories_tree")} | {"page_content": {"Home": DOC["page_content"]["Home"]}}
+
+
+def test_malformed_section_is_skipped():
+    sections = collect(['{"a": {"x": tru}, "b": [1, 2]}'])
+    assert sections == {"b": [1, 2]}